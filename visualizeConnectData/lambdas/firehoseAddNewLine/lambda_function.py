@@ -2,29 +2,42 @@ import os
 import json
 import logging
 import base64
+import datetime
  
 logger = logging.getLogger()
 logger.setLevel(os.environ['LOG_LEVEL'])
 
+# With dynamic partitioning Firehose writes each record under the date of its InitiationTimestamp, returned with the
+# record as partition keys, instead of the time it was received
+dynamicPartitioning = os.environ.get('DynamicPartitioning', 'false').lower() == 'true'
+
+# base64 of b'\n', appended as is when the data ends on a full quantum
+ENCODED_NEWLINE = 'Cg=='
+
 def lambda_handler(event, context):
     try:
         logger.info('Start {}, Version {}'.format(context.function_name, context.function_version))
-        logger.info('Event: ' + json.dumps(event))
+        # A transformation batch holds up to 6 MB of records, the event is only written at DEBUG level
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Event: ' + json.dumps(event))
         
         output = []
+        encodedBytes = 0
         for record in event['records']:
-            payload = base64.b64decode(record['data'])
-            payload = payload + '\n'.encode('ascii')
+            data = addNewLine(record['data'])
+            encodedBytes += len(data)
 
             outputRecord = {
                 'recordId': record['recordId'],
                 'result': 'Ok',
-                'data': base64.b64encode(payload)
+                'data': data
             }
+            if dynamicPartitioning:
+                outputRecord['metadata'] = {'partitionKeys': partitionKeys(record)}
             output.append(outputRecord)
             
         returnValue = {'records': output}
-        logger.info(returnValue)
+        logger.info('Records: {}, Bytes: {}'.format(len(output), encodedBytes))
         return returnValue
         
     except Exception as e:
@@ -33,3 +46,47 @@ def lambda_handler(event, context):
 
     finally:
         logger.info('Finished')
+
+def addNewLine(data):
+    # Appends a newline to the base64 data of a record without decoding the rest of it. Every 4 characters encode 3
+    # bytes, only the last quantum changes when it is padded: it is decoded, extended and encoded again. The result is
+    # the only copy of the data. Data that is not in canonical base64 length is decoded completely, as before
+    if len(data) % 4 != 0:
+        return base64.b64encode(base64.b64decode(data) + b'\n').decode('ascii')
+
+    if not data.endswith('='):
+        return data + ENCODED_NEWLINE
+
+    last = base64.b64decode(data[-4:]) + b'\n'
+    return data[:-4] + base64.b64encode(last).decode('ascii')
+
+def partitionKeys(record):
+    # year, month and day of the InitiationTimestamp of the CTR and its Channel. A record that is not a CTR is 
+    # partitioned by the time Firehose received it, as without dynamic partitioning
+    try:
+        ctr = json.loads(base64.b64decode(record['data']).decode('utf-8'))
+    except ValueError:
+        ctr = None
+    if not isinstance(ctr, dict):
+        ctr = {}
+        
+    keys = dateKeys(ctr.get('InitiationTimestamp'))
+    if keys is None:
+        arrival = datetime.datetime.utcfromtimestamp(record['approximateArrivalTimestamp'] / 1000)
+        keys = {'year': '{:04d}'.format(arrival.year), 'month': '{:02d}'.format(arrival.month), 
+                'day': '{:02d}'.format(arrival.day)}
+        
+    channel = ctr.get('Channel')
+    if isinstance(channel, str) and len(channel) > 0:
+        keys['channel'] = channel
+    return keys
+    
+def dateKeys(timestamp):
+    # Connect timestamps are yyyy-mm-ddThh:mm:ssZ, only the date is checked
+    if not isinstance(timestamp, str) or len(timestamp) < 10:
+        return None
+    try:
+        date = datetime.datetime.strptime(timestamp[:10], '%Y-%m-%d')
+    except ValueError:
+        return None
+    return {'year': '{:04d}'.format(date.year), 'month': '{:02d}'.format(date.month), 'day': '{:02d}'.format(date.day)}
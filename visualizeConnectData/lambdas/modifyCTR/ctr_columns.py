@@ -0,0 +1,170 @@
+import datetime
+import isodate
+import ctr_timestamps
+
+# numpy is not part of the Lambda runtime, it comes with the pyarrow layer used for parquet output
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Converts whole columns of timestamps and durations, a list of str or a numpy array of str or fixed width bytes.
+# Results are numpy masked arrays of int64 seconds, an entry is masked when its value is missing or invalid. Values
+# in the fixed layouts are converted with array operations, any other value goes through the scalar parser so every
+# entry has the result (or error) the per record conversion gives
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# (length, separator, suffix, scalar parser) of the timestamp layouts in ctr_timestamps
+CTR = (20, ord('T'), ord('Z'), ctr_timestamps.parseCtrTimestamp)
+MODIFIED = (19, ord(' '), None, ctr_timestamps.parseModifiedTimestamp)
+
+# Offsets of the date and time digits in both layouts
+DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+
+def isAvailable():
+    return numpy is not None
+
+def toColumn(values):
+    # Entries that are not strings become '', which no parser accepts
+    if isinstance(values, numpy.ndarray) and values.dtype.kind in 'SU':
+        return values
+    return numpy.array([value if type(value) is str else '' for value in values], dtype=str)
+
+def decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return str(value)
+
+def codesOf(column, width):
+    # Returns the characters of every entry as a (len(column), width) matrix of code points
+    kind = column.dtype.kind
+    if column.dtype.itemsize // (4 if kind == 'U' else 1) < width:
+        column = column.astype('{}{}'.format(kind, width))
+    column = numpy.ascontiguousarray(column)
+    return column.view(numpy.uint32 if kind == 'U' else numpy.uint8).reshape(len(column), -1).astype(numpy.int64)
+
+def daysFromCivil(year, month, day):
+    # Days since 1970-01-01 of a proleptic Gregorian date
+    year = year - (month <= 2)
+    era = year // 400
+    yearOfEra = year - era * 400
+    dayOfYear = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    dayOfEra = yearOfEra * 365 + yearOfEra // 4 - yearOfEra // 100 + dayOfYear
+    return era * 146097 + dayOfEra - 719468
+
+def parseTimestamps(values, layout=CTR):
+    # Returns the seconds since the epoch of every timestamp, the timestamps are UTC like the CTR values
+    length, separator, suffix, parse = layout
+    column = toColumn(values)
+    count = len(column)
+    seconds = numpy.zeros(count, dtype=numpy.int64)
+    mask = numpy.ones(count, dtype=bool)
+    if count == 0:
+        return numpy.ma.MaskedArray(seconds, mask=mask)
+
+    codes = codesOf(column, length)
+    lengths = numpy.char.str_len(column)
+    fast = (lengths == length) & (codes[:, 4] == 45) & (codes[:, 7] == 45) & (codes[:, 10] == separator)
+    fast &= (codes[:, 13] == 58) & (codes[:, 16] == 58)
+    if suffix is not None:
+        fast &= codes[:, length - 1] == suffix
+
+    digits = codes[:, DIGITS] - 48
+    fast &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+    digits = digits.clip(0, 9)
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    second = digits[:, 12] * 10 + digits[:, 13]
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    monthDays = numpy.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[(month - 1).clip(0, 11)]
+    monthDays += leap & (month == 2)
+    fast &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= monthDays)
+    fast &= (hour <= 23) & (minute <= 59) & (second <= 59)
+
+    seconds = daysFromCivil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    mask = ~fast
+
+    # Values outside the fixed layout may still be accepted by strptime (single digit fields for example)
+    for index in numpy.flatnonzero(mask & (lengths > 0)):
+        try:
+            timestamp = parse(decode(column[index]))
+        except (ValueError, UnicodeDecodeError):
+            continue
+        seconds[index] = (timestamp - EPOCH) // datetime.timedelta(seconds=1)
+        mask[index] = False
+
+    return numpy.ma.MaskedArray(seconds, mask=mask)
+
+def durationSeconds(value):
+    return int(isodate.parse_duration(value).total_seconds())
+
+def parseDurations(values, seconds=durationSeconds):
+    # Returns the seconds of every ISO 8601 duration. Durations have no fixed layout, but a column holds few distinct
+    # values, so seconds(value) is called once per distinct value and the results are spread back to the column
+    if isinstance(values, numpy.ndarray):
+        distinct, inverse = numpy.unique(toColumn(values), return_inverse=True)
+        inverse = inverse.reshape(-1)
+    else:
+        positions = {}
+        inverse = numpy.array([positions.setdefault(value if type(value) is str else '', len(positions))
+                               for value in values], dtype=numpy.intp)
+        distinct = list(positions)
+
+    results = numpy.zeros(len(distinct), dtype=numpy.int64)
+    mask = numpy.ones(len(distinct), dtype=bool)
+    for index, value in enumerate(distinct):
+        if len(value) == 0:
+            continue
+        try:
+            results[index] = seconds(decode(value))
+        except Exception:
+            continue
+        mask[index] = False
+
+    return numpy.ma.MaskedArray(results[inverse], mask=mask[inverse])
+
+def durationColumns(rows, projectTimeSeconds=durationSeconds):
+    # The ContactDuration, IvrDuration and Attributes_udProjectTime columns of flattened CTRs with modified timestamps,
+    # computed like addContactDuration, addIvrDuration and convertProjectTime in lambda_function. Returns the columns
+    # and the error of every row that the per record transform fails, by index
+    initiation = parseTimestamps([row.get('InitiationTimestamp') for row in rows], MODIFIED)
+    disconnect = parseTimestamps([row.get('DisconnectTimestamp') for row in rows], MODIFIED)
+    enqueue = parseTimestamps([row.get('Queue_EnqueueTimestamp') for row in rows], MODIFIED)
+    hasEnqueue = numpy.array(['Queue_EnqueueTimestamp' in row for row in rows], dtype=bool)
+    hasProjectTime = numpy.array(['Attributes_udProjectTime' in row for row in rows], dtype=bool)
+
+    contactDuration = disconnect - initiation
+    ivrDuration = numpy.ma.where(hasEnqueue, enqueue - initiation, contactDuration)
+    projectTime = parseDurations([row.get('Attributes_udProjectTime') for row in rows], projectTimeSeconds)
+
+    # Checked in the order the per record transform runs its steps
+    errors = {}
+    checks = [
+        (hasProjectTime & numpy.ma.getmaskarray(projectTime), 'Invalid Attributes_udProjectTime'),
+        (numpy.ma.getmaskarray(contactDuration), 'Invalid InitiationTimestamp or DisconnectTimestamp'),
+        (numpy.ma.getmaskarray(ivrDuration), 'Invalid Queue_EnqueueTimestamp')
+    ]
+    for failed, error in checks:
+        for index in numpy.flatnonzero(failed).tolist():
+            errors.setdefault(index, error)
+
+    # Rows without udProjectTime have no value in the column
+    projectTime[~hasProjectTime] = numpy.ma.masked
+    columns = {
+        'Attributes_udProjectTime': projectTime,
+        'ContactDuration': contactDuration,
+        'IvrDuration': ivrDuration
+    }
+    return columns, errors
+
+def dropRows(rows, columns, indexes):
+    # Removes the rows at indexes from the rows and from every column
+    keep = numpy.ones(len(rows), dtype=bool)
+    keep[list(indexes)] = False
+    rows = [row for row, kept in zip(rows, keep.tolist()) if kept]
+    return rows, {name: column[keep] for name, column in columns.items()}
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+# Attributes repeat across the records of a Firehose object (a handful of cities and durations for hundreds of
+# contacts). Before a batch of records is processed the distinct values of every attribute are collected and the
+# ones that are not cached are resolved together, then the transform reads the results instead of resolving per record
+
+class Failed:
+    # Result of a value that could not be resolved, the error is raised for every record holding the value
+    __slots__ = ['error']
+
+    def __init__(self, error):
+        self.error = error
+
+def resolveEach(function):
+    # Builds a resolveValues for a function of a single value, an error only fails the records holding that value
+    def resolveValues(values):
+        results = {}
+        for value in values:
+            try:
+                results[value] = function(value)
+            except Exception as e:
+                results[value] = Failed(e)
+        return results
+
+    return resolveValues
+
+class Enrichment:
+    # resolveValues(values) returns a dict with the result of every value, it may raise to fail the whole batch.
+    # Results are kept for the cacheSize most recently used values across warm invocations, a cacheSize of 0 keeps none
+    # for a resolveValues that has its own cache
+    def __init__(self, attribute, resolveValues, cacheSize=10000):
+        self.attribute = attribute
+        self.resolveValues = resolveValues
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.batch = {}
+        self.lock = threading.Lock()
+        self.resetCounters()
+
+    def resetCounters(self):
+        self.counters = {'Values': 0, 'Distinct': 0, 'Hits': 0, 'Misses': 0}
+
+    def resolve(self, values):
+        # Returns the result of every value, only values that are not cached are passed to resolveValues
+        results = {}
+        missing = []
+        with self.lock:
+            for value in values:
+                if value in self.cache:
+                    self.cache.move_to_end(value)
+                    results[value] = self.cache[value]
+                else:
+                    missing.append(value)
+
+            self.counters['Hits'] += len(results)
+            self.counters['Misses'] += len(missing)
+
+        if len(missing) == 0:
+            return results
+
+        resolved = self.resolveValues(missing)
+        for value in missing:
+            results[value] = resolved.get(value)
+
+        if self.cacheSize > 0:
+            with self.lock:
+                for value in missing:
+                    self.cache[value] = results[value]
+                while len(self.cache) > self.cacheSize:
+                    self.cache.popitem(last=False)
+
+        return results
+
+    def prepare(self, values):
+        # values holds the attribute of every record of the batch. Objects processed at the same time replace each 
+        # other's batch, values of a replaced batch are then found in the cache
+        distinct = set(values)
+        with self.lock:
+            self.counters['Values'] += len(values)
+            self.counters['Distinct'] += len(distinct)
+        self.batch = self.resolve(distinct)
+
+    def lookup(self, value):
+        # Called by the workers while the batch is processed, values of the batch are read without a lock
+        batch = self.batch
+        if value in batch:
+            result = batch[value]
+        else:
+            result = self.resolve([value])[value]
+
+        if isinstance(result, Failed):
+            raise result.error
+        return result
+
+class EnrichmentStage:
+    def __init__(self, enrichments):
+        self.enrichments = list(enrichments)
+
+    def resetCounters(self):
+        for enrichment in self.enrichments:
+            enrichment.resetCounters()
+
+    def counters(self):
+        return {enrichment.attribute: dict(enrichment.counters) for enrichment in self.enrichments}
+
+    def prepare(self, records):
+        # records are unflattened CTRs, values that are not strings are left for the transform to report
+        values = {enrichment.attribute: [] for enrichment in self.enrichments}
+        for record in records:
+            attributes = record.get('Attributes') if isinstance(record, dict) else None
+            if not isinstance(attributes, dict):
+                continue
+            for attribute, attributeValues in values.items():
+                value = attributes.get(attribute)
+                if isinstance(value, str):
+                    attributeValues.append(value)
+
+        for enrichment in self.enrichments:
+            enrichment.prepare(values[enrichment.attribute])
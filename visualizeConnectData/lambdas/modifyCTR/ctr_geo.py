@@ -0,0 +1,123 @@
+import os
+import json
+import threading
+import urllib.request
+from collections import OrderedDict
+
+# Bundled with the function, one city per line: normalized name, latitude, longitude and state separated by tabs
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cities.tsv')
+
+def normalizeCity(city):
+    city = city.lower()
+    city = city.replace(' ', '')
+    city = city.replace('_', '')
+    return city
+
+def loadIndex(path):
+    # Read once per container, the values are shared by every record that resolves to the city
+    index = {}
+    with open(path, encoding='utf-8') as citiesFile:
+        for line in citiesFile:
+            if line.startswith('#') or not line.strip():
+                continue
+            name, latitude, longitude, state = line.rstrip('\n').split('\t')
+            index[name] = {'Latitude': float(latitude), 'Longitude': float(longitude), 'State': state}
+
+    return index
+
+class LocalGeoBackend:
+    def __init__(self, index):
+        self.index = index
+
+    def lookup(self, cities):
+        index = self.index
+        return {city: index[city] for city in cities if city in index}
+
+class RemoteGeoBackend:
+    # POSTs {"Cities": [...]} to the endpoint, which answers {"<city>": {"Latitude":, "Longitude":, "State":}, ...}.
+    # Cities are sent in groups of batchSize, so a Firehose object needs a handful of requests instead of one per record
+    def __init__(self, endpoint, batchSize=100, timeout=5):
+        self.endpoint = endpoint
+        self.batchSize = batchSize
+        self.timeout = timeout
+
+    def lookup(self, cities):
+        cities = list(cities)
+        geos = {}
+        for start in range(0, len(cities), self.batchSize):
+            request = urllib.request.Request(
+                self.endpoint,
+                data=json.dumps({'Cities': cities[start:start + self.batchSize]}).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                geos.update(json.loads(response.read().decode('utf-8')))
+
+        return geos
+
+class GeoEnricher:
+    # Keeps the geo of the most recently used cities across warm invocations, unknown cities included so they are
+    # not asked for again. Names are normalized before they are cached, 'New York City' and 'new_york_city' share an entry.
+    # backend.lookup(cities) resolves many normalized city names at once, it returns a dict with an entry for every city
+    # found and cities that are not in the result are unknown
+    def __init__(self, backend, cacheSize=10000):
+        self.backend = backend
+        self.cacheSize = cacheSize
+        self.geos = OrderedDict()
+        self.lock = threading.Lock()
+
+    def cached(self, city):
+        # Returns (found, geo)
+        with self.lock:
+            if city not in self.geos:
+                return False, None
+            self.geos.move_to_end(city)
+            return True, self.geos[city]
+
+    def store(self, cities, geos):
+        with self.lock:
+            for city in cities:
+                self.geos[city] = geos.get(city)
+                self.geos.move_to_end(city)
+            while len(self.geos) > self.cacheSize:
+                self.geos.popitem(last=False)
+
+    def resolve(self, cities):
+        # Looks up every city that is not cached with a single backend call and returns the geo of each city
+        geos = {}
+        missing = set()
+        for city in set(normalizeCity(city) for city in cities):
+            found, geo = self.cached(city)
+            if found:
+                geos[city] = geo
+            else:
+                missing.add(city)
+
+        if len(missing) > 0:
+            resolved = self.backend.lookup(missing)
+            self.store(missing, resolved)
+            for city in missing:
+                geos[city] = resolved.get(city)
+
+        return geos
+
+    def get(self, city):
+        city = normalizeCity(city)
+        found, geo = self.cached(city)
+        if found:
+            return geo
+
+        return self.resolve([city])[city]
+
+def createEnricher(backendName, endpoint=None, cacheSize=10000):
+    if backendName == 'local':
+        backend = LocalGeoBackend(loadIndex(CITIES_FILE))
+    elif backendName == 'remote':
+        if not endpoint:
+            raise Exception('GeoBackend remote requires GeoEndpoint')
+        backend = RemoteGeoBackend(endpoint)
+    else:
+        raise Exception('Invalid GeoBackend ' + backendName)
+
+    return GeoEnricher(backend, cacheSize)
@@ -0,0 +1,157 @@
+import io
+import ctr_columns
+import ctr_timestamps
+
+# pyarrow is not part of the Lambda runtime, add it with a layer (for example AWS SDK for pandas) to use parquet output
+try:
+    import numpy
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Matches the columns of the Athena table created by scripts/athena/deploy.sh, so every file has the same schema.
+# Flattened keys that are not listed here are added after these columns as strings
+CTR_COLUMNS = [
+    ('AWSAccountId', 'string'),
+    ('AWSContactTraceRecordFormatVersion', 'string'),
+    ('Agent_ARN', 'string'),
+    ('Agent_AfterContactWorkDuration', 'int'),
+    ('Agent_AfterContactWorkEndTimestamp', 'timestamp'),
+    ('Agent_AfterContactWorkStartTimestamp', 'timestamp'),
+    ('Agent_AgentInteractionDuration', 'int'),
+    ('Agent_ConnectedToAgentTimestamp', 'timestamp'),
+    ('Agent_CustomerHoldDuration', 'int'),
+    ('Agent_TalkDuration', 'int'),
+    ('Agent_HierarchyGroups_Level1_ARN', 'string'),
+    ('Agent_HierarchyGroups_Level1_GroupName', 'string'),
+    ('Agent_HierarchyGroups_Level2_ARN', 'string'),
+    ('Agent_HierarchyGroups_Level2_GroupName', 'string'),
+    ('Agent_HierarchyGroups_Level3_ARN', 'string'),
+    ('Agent_HierarchyGroups_Level3_GroupName', 'string'),
+    ('Agent_HierarchyGroups_Level4_ARN', 'string'),
+    ('Agent_HierarchyGroups_Level4_GroupName', 'string'),
+    ('Agent_HierarchyGroups_Level5_ARN', 'string'),
+    ('Agent_HierarchyGroups_Level5_GroupName', 'string'),
+    ('Agent_LongestHoldDuration', 'int'),
+    ('Agent_NumberOfHolds', 'int'),
+    ('Agent_RoutingProfile_ARN', 'string'),
+    ('Agent_RoutingProfile_Name', 'string'),
+    ('Agent_Username', 'string'),
+    ('AgentConnectionAttempts', 'int'),
+    ('Attributes_udCounter', 'string'),
+    ('Attributes_udPlay', 'string'),
+    ('Attributes_udCity', 'string'),
+    ('Attributes_udCity_Latitude', 'double'),
+    ('Attributes_udCity_Longitude', 'double'),
+    ('Attributes_udCity_State', 'string'),
+    ('Attributes_udColor', 'string'),
+    ('Attributes_udDOB', 'date'),
+    ('Attributes_udFood', 'string'),
+    ('Attributes_udProjectTime', 'int'),
+    ('Channel', 'string'),
+    ('ConnectedToSystemTimestamp', 'timestamp'),
+    ('ContactId', 'string'),
+    ('CustomerEndpoint_Address', 'string'),
+    ('CustomerEndpoint_Type', 'string'),
+    ('DisconnectReason', 'string'),
+    ('DisconnectTimestamp', 'timestamp'),
+    ('InitialContactId', 'string'),
+    ('InitiationMethod', 'string'),
+    ('InitiationTimestamp', 'timestamp'),
+    ('InstanceARN', 'string'),
+    ('LastUpdateTimestamp', 'timestamp'),
+    ('NextContactId', 'string'),
+    ('PreviousContactId', 'string'),
+    ('Queue_ARN', 'string'),
+    ('Queue_DequeueTimestamp', 'timestamp'),
+    ('Queue_Duration', 'int'),
+    ('Queue_EnqueueTimestamp', 'timestamp'),
+    ('Queue_Name', 'string'),
+    ('SystemEndpoint_Address', 'string'),
+    ('SystemEndpoint_Type', 'string'),
+    ('TransferCompletedTimestamp', 'timestamp'),
+    ('TransferredToEndpoint', 'string'),
+    ('ContactDuration', 'int'),
+    ('IvrDuration', 'int'),
+    ('Source_Bucket', 'string'),
+    ('Source_Key', 'string')
+]
+
+def isAvailable():
+    return pyarrow is not None
+
+def arrowType(columnType):
+    return {
+        'string': pyarrow.string(),
+        'int': pyarrow.int32(),
+        'double': pyarrow.float64(),
+        'timestamp': pyarrow.timestamp('ms'),
+        'date': pyarrow.date32()
+    }[columnType]
+
+def convertValue(value, columnType):
+    # Values that do not fit the column type are written as null instead of failing the whole batch
+    if value is None or value == '' or value == [] or value == {}:
+        return None
+
+    try:
+        if columnType == 'string':
+            return value if isinstance(value, str) else str(value)
+        elif columnType == 'int':
+            return int(value)
+        elif columnType == 'double':
+            return float(value)
+        elif columnType == 'timestamp':
+            return ctr_timestamps.parseModifiedTimestamp(value)
+        elif columnType == 'date':
+            return ctr_timestamps.parseDate(value)
+    except (TypeError, ValueError):
+        return None
+
+def buildSchema(rows):
+    columns = list(CTR_COLUMNS)
+
+    knownColumns = set(name for name, columnType in CTR_COLUMNS)
+    extraColumns = set()
+    for row in rows:
+        for key in row:
+            if key not in knownColumns:
+                extraColumns.add(key)
+
+    columns.extend((name, 'string') for name in sorted(extraColumns))
+    return columns
+
+def fromMasked(values, columnType):
+    # values is a numpy masked array of seconds for timestamp columns, of the values for the other types
+    if columnType == 'timestamp':
+        values = values * 1000
+    return pyarrow.array(values.filled(0), type=arrowType(columnType), mask=numpy.ma.getmaskarray(values))
+
+def toParquet(rows, compression='snappy', computed=None):
+    # Returns the bytes of one parquet file holding all rows, one column per flattened key. computed holds columns 
+    # already converted for all rows as numpy masked arrays, by name. Timestamp columns are converted by ctr_columns
+    if not isAvailable():
+        raise Exception('Parquet output requires pyarrow')
+
+    computed = computed or {}
+    columns = buildSchema(rows)
+
+    arrays = []
+    for name, columnType in columns:
+        if name in computed:
+            arrays.append(fromMasked(computed[name], columnType))
+        elif columnType == 'timestamp':
+            values = ctr_columns.parseTimestamps([row.get(name) for row in rows], ctr_columns.MODIFIED)
+            arrays.append(fromMasked(values, columnType))
+        else:
+            arrays.append(pyarrow.array([convertValue(row.get(name), columnType) for row in rows],
+                                        type=arrowType(columnType)))
+
+    schema = pyarrow.schema([(name, arrowType(columnType)) for name, columnType in columns])
+    table = pyarrow.Table.from_arrays(arrays, schema=schema)
+
+    # Athena reads INT96 timestamps from every engine version
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(table, buffer, compression=compression, use_deprecated_int96_timestamps=True)
+    return buffer.getvalue()
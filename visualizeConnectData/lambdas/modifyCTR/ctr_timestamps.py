@@ -0,0 +1,55 @@
+import datetime
+import functools
+
+# Connect writes every CTR timestamp as yyyy-mm-ddThh:mm:ssZ and the modified CTRs hold them as yyyy-mm-dd hh:mm:ss,
+# so both are read by slicing instead of going through strptime. Values in any other layout fall back to strptime,
+# which keeps the results and errors the same as before
+CTR_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MODIFIED_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_FORMAT = '%Y-%m-%d'
+
+# The same timestamps come back within a batch (LastUpdateTimestamp is read by dedupeRecords and processRecord)
+CACHE_SIZE = 4096
+
+def parseFixed(value, separator, length, fallbackFormat):
+    if (len(value) == length and value[4] == '-' and value[7] == '-' and value[10] == separator and
+            value[13] == ':' and value[16] == ':'):
+        digits = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]
+        # Rules out the signs, spaces, underscores and non ASCII digits int allows and strptime does not
+        if digits.isascii() and digits.isdigit():
+            # datetime raises the same ValueError as strptime for a day or hour out of range
+            return datetime.datetime(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]),
+                                     int(digits[8:10]), int(digits[10:12]), int(digits[12:14]))
+
+    return datetime.datetime.strptime(value, fallbackFormat)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parseCtrTimestamp(value):
+    if value[-1:] != 'Z':
+        return datetime.datetime.strptime(value, CTR_TIMESTAMP_FORMAT)
+    return parseFixed(value, 'T', 20, CTR_TIMESTAMP_FORMAT)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parseModifiedTimestamp(value):
+    return parseFixed(value, ' ', 19, MODIFIED_TIMESTAMP_FORMAT)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parseDate(value):
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        digits = value[0:4] + value[5:7] + value[8:10]
+        if digits.isascii() and digits.isdigit():
+            return datetime.date(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]))
+
+    return datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+def toModifiedTimestamp(value):
+    # Athena Timestamp data type does not support Connect timestamps (yyyy-mm-ddThh:mm:ssZ)
+    # https://docs.aws.amazon.com/connect/latest/adminguide/ctr-data-model.html
+    # https://docs.aws.amazon.com/athena/latest/ug/data-types.html
+    # Without this you need to use date_parse(EventTimestamp , '%Y-%m-%dT%H:%i:%s.%fZ') and represent it as a STRING
+    if len(value) == 20 and value[10] == 'T' and value[19] == 'Z':
+        return value[:10] + ' ' + value[11:19]
+
+    modifiedTimestamp = value.replace('T', ' ')
+    modifiedTimestamp = modifiedTimestamp.replace('Z', '')
+    return modifiedTimestamp
@@ -0,0 +1,81 @@
+# Transforms a flattened CTR in a single pass over its keys. The steps are declared once per container. A key name
+# is classified the first time it is seen, and the timestamp keys of a record layout (its keys in order) are kept,
+# so records that share a layout only visit their timestamp keys. Field steps and derived fields look their keys up
+# directly and never scan the record
+
+NORMALIZE = 1
+PARSE = 2
+
+class TransformPipeline:
+    # isTimestampKey(key) picks the keys whose value is passed through normalizeTimestamp(value)
+    # fields is a list of (key, function(record, key, value)), called in order when the key is in the record
+    # derived is a list of (timestampKeys, function(record, timestamps)), called in order on every record with the
+    # listed timestamp keys parsed by parseTimestamp(normalizedValue)
+    def __init__(self, isTimestampKey, normalizeTimestamp, parseTimestamp, fields=(), derived=(), maxKeys=10000):
+        self.isTimestampKey = isTimestampKey
+        self.normalizeTimestamp = normalizeTimestamp
+        self.parseTimestamp = parseTimestamp
+        self.fields = list(fields)
+        self.derived = list(derived)
+        self.parsedKeys = set(key for timestampKeys, function in self.derived for key in timestampKeys)
+        # Attribute names come from contact flows, the tables are cleared when they grow past maxKeys
+        self.maxKeys = maxKeys
+        self.keyKinds = {}
+        self.layouts = {}
+
+    def classify(self, key):
+        kind = 0
+        if self.isTimestampKey(key):
+            kind |= NORMALIZE
+        if key in self.parsedKeys:
+            kind |= PARSE
+
+        if len(self.keyKinds) >= self.maxKeys:
+            self.keyKinds.clear()
+        self.keyKinds[key] = kind
+        return kind
+
+    def compile(self, layout):
+        # Returns the (key, kind) pairs of the timestamp and parsed keys of a layout
+        keyKinds = self.keyKinds
+        steps = []
+        for key in layout:
+            kind = keyKinds.get(key)
+            if kind is None:
+                kind = self.classify(key)
+            if kind:
+                steps.append((key, kind))
+
+        if len(self.layouts) >= self.maxKeys:
+            self.layouts.clear()
+        self.layouts[layout] = steps
+        return steps
+
+    def transform(self, record):
+        # Changes the record in place and returns it
+        layout = tuple(record)
+        steps = self.layouts.get(layout)
+        if steps is None:
+            steps = self.compile(layout)
+
+        normalizeTimestamp = self.normalizeTimestamp
+        timestamps = {}
+        for key, kind in steps:
+            value = record[key]
+            if value is None:
+                continue
+
+            if kind & NORMALIZE:
+                value = normalizeTimestamp(value)
+                record[key] = value
+            if kind & PARSE:
+                timestamps[key] = self.parseTimestamp(value)
+
+        for key, function in self.fields:
+            if key in record:
+                function(record, key, record[key])
+
+        for timestampKeys, function in self.derived:
+            function(record, timestamps)
+
+        return record
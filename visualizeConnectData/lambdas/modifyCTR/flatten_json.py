@@ -10,9 +10,7 @@ try:
 except ImportError:
     from collections import Iterable
 
-from util import check_if_numbers_are_consecutive
 import six
-import copy
 import re
 from math import isnan
 
@@ -33,6 +31,110 @@ def _construct_key(previous_key, separator, new_key):
         return new_key
 
 
+# Flattened keys are shared across calls, so records with the same layout
+# reuse the same key strings instead of building new ones per record.
+# For every separator and prefix key this holds the keys of the children,
+# by dictionary key and by list index. Threads flatten at the same time, so
+# keys are only added with setdefault and every thread keeps the key stored
+# first
+_interned_keys = dict()
+_MAX_INTERNED_PREFIXES = 10000
+_MAX_INTERNED_CHILDREN = 1000
+
+_CONTAINERS = (dict, list, set, tuple)
+
+
+def _interned_children(separator, key):
+    """
+    Returns the interned keys of the children of key as a (fields, items)
+    pair of dicts, by string dictionary key and by list index
+    Keys of other types could compare equal to a different key (True == 1)
+    while building a different flattened key, so they are not interned
+    and get an empty pair that is not kept
+    """
+    if key is not None and type(key) is not str:
+        return dict(), dict()
+
+    by_prefix = _interned_keys.get(separator)
+    if by_prefix is None:
+        by_prefix = _interned_keys.setdefault(separator, dict())
+
+    children = by_prefix.get(key)
+    if children is None:
+        children = (dict(), dict())
+        if len(by_prefix) < _MAX_INTERNED_PREFIXES:
+            children = by_prefix.setdefault(key, children)
+    return children
+
+
+def _flatten_object(object_, key, separator, root_keys_to_ignore,
+                    flattened_dict):
+    """
+    Adds the flattened items of object_ to flattened_dict, depth first in
+    the order of iteration. An explicit stack of iterators replaces the
+    recursion, so the depth of object_ is not limited by the Python stack
+    :param object_: object to flatten
+    :param key: carries the concatenated key for the object_
+    :param separator: string to separate dictionary keys by
+    :param root_keys_to_ignore: set of root keys to ignore from flattening
+    :param flattened_dict: dictionary the flattened items are added to
+    :return: None
+    """
+    # Empty object can't be iterated and anything else is not a container,
+    # take as is
+    if not object_ or not isinstance(object_, _CONTAINERS):
+        flattened_dict[key] = object_
+        return
+
+    stack = [_stack_entry(object_, key, separator, root_keys_to_ignore)]
+    while stack:
+        children, key, is_dict, fields, items, ignore = stack[-1]
+        for child_key, child in children:
+            if is_dict:
+                if child_key in ignore:
+                    continue
+                if type(child_key) is str:
+                    child_flat_key = fields.get(child_key)
+                    if child_flat_key is None:
+                        child_flat_key = _construct_key(key, separator,
+                                                        child_key)
+                        if len(fields) < _MAX_INTERNED_CHILDREN:
+                            child_flat_key = fields.setdefault(
+                                child_key, child_flat_key)
+                else:
+                    child_flat_key = _construct_key(key, separator, child_key)
+            else:
+                child_flat_key = items.get(child_key)
+                if child_flat_key is None:
+                    child_flat_key = _construct_key(key, separator, child_key)
+                    if len(items) < _MAX_INTERNED_CHILDREN:
+                        child_flat_key = items.setdefault(child_key,
+                                                          child_flat_key)
+
+            if child and isinstance(child, _CONTAINERS):
+                # Walk the child first, this iterator resumes after it
+                stack.append(_stack_entry(child, child_flat_key, separator,
+                                          root_keys_to_ignore))
+                break
+            flattened_dict[child_flat_key] = child
+        else:
+            stack.pop()
+
+
+def _stack_entry(object_, key, separator, root_keys_to_ignore):
+    """
+    Returns the state _flatten_object keeps for a container: an iterator
+    over its (key, child) pairs, its flattened key, whether it is a dict,
+    the interned keys of its children and the keys to ignore in it
+    """
+    fields, items = _interned_children(separator, key)
+    if isinstance(object_, dict):
+        # Keys under an empty key are treated as root keys
+        ignore = root_keys_to_ignore if not key else ()
+        return iter(object_.items()), key, True, fields, items, ignore
+    return enumerate(object_), key, False, fields, items, ()
+
+
 def flatten(nested_dict, separator="_", root_keys_to_ignore=set()):
     """
     Flattens a dictionary with nested structure to a dictionary with no
@@ -53,33 +155,8 @@ def flatten(nested_dict, separator="_", root_keys_to_ignore=set()):
     # ultimately returned
     flattened_dict = dict()
 
-    def _flatten(object_, key):
-        """
-        For dict, list and set objects_ calls itself on the elements and for
-        other types assigns the object_ to
-        the corresponding key in the global flattened_dict
-        :param object_: object to flatten
-        :param key: carries the concatenated key for the object_
-        :return: None
-        """
-        # Empty object can't be iterated, take as is
-        if not object_:
-            flattened_dict[key] = object_
-        # These object types support iteration
-        elif isinstance(object_, dict):
-            for object_key in object_:
-                if not (not key and object_key in root_keys_to_ignore):
-                    _flatten(object_[object_key], _construct_key(key,
-                                                                 separator,
-                                                                 object_key))
-        elif isinstance(object_, (list, set, tuple)):
-            for index, item in enumerate(object_):
-                _flatten(item, _construct_key(key, separator, index))
-        # Anything left take as is
-        else:
-            flattened_dict[key] = object_
-
-    _flatten(nested_dict, None)
+    _flatten_object(nested_dict, None, separator, root_keys_to_ignore,
+                    flattened_dict)
     return flattened_dict
 
 
@@ -106,7 +183,48 @@ def flatten_preserve_lists(nested_dict, separator="_",
     :param root_keys_to_ignore: set of root keys to ignore from flattening
     :param max_list_index: maximum list index to process
     :param max_depth: maximum nesting depth to process
-    :return: flattened dictionary
+    :return: list of flattened dictionaries, one per row
+    """
+    return list(iter_flatten_preserve_lists(nested_dict, separator,
+                                            root_keys_to_ignore,
+                                            max_list_index, max_depth))
+
+
+def _row_values(row):
+    """
+    Merges the layers of a row, oldest first, into one dictionary
+    :param row: (layer, parent row) pair, the first row has no parent
+    :return: dictionary with the values of the row
+    """
+    layers = []
+    while row is not None:
+        layer, row = row
+        layers.append(layer)
+
+    values = dict()
+    for layer in reversed(layers):
+        values.update(layer)
+    return values
+
+
+def iter_flatten_preserve_lists(nested_dict, separator="_",
+                                root_keys_to_ignore=set(),
+                                max_list_index=3, max_depth=3):
+    """
+    Same as flatten_preserve_lists, but yields the rows one at a time
+
+    Lists go into rows, like in a relational database. Rows are kept in
+    groups and a value is written once for the whole last group. A row is
+    a chain of layers that is shared by the rows copied from it, so
+    copying a row for a list element does not copy its values. The
+    dictionaries are only built when the rows are yielded
+
+    :param nested_dict: dictionary we want to flatten
+    :param separator: string to separate dictionary keys by
+    :param root_keys_to_ignore: set of root keys to ignore from flattening
+    :param max_list_index: maximum list index to process
+    :param max_depth: maximum nesting depth to process
+    :return: generator of flattened dictionaries, one per row
     """
 
     assert isinstance(nested_dict, dict), "flatten requires a dictionary input"
@@ -134,7 +252,7 @@ def flatten_preserve_lists(nested_dict, separator="_",
         # These object types support iteration
         # dict always go into columns
         elif isinstance(object_, dict):
-            first_key = list(object_.keys())[0]
+            first_key = next(iter(object_))
             # if only 1 child value, and child value not a dict or list
             # flatten immediately
             if len(object_) == 1 \
@@ -156,130 +274,103 @@ def flatten_preserve_lists(nested_dict, separator="_",
         else:
             flattened_dict[key] = object_
 
+    # Each group is a [rows, layer] pair. The rows are (layer, parent row)
+    # chains that no longer change and layer holds the values written to
+    # every row of the group since. Values are always written to the last
+    # group
+    groups = []
+
+    def _write(key, value):
+        groups[-1][1][key] = value
+
+    def _freeze(group):
+        """
+        Returns the rows of a group with its pending values as their
+        newest layer
+        """
+        rows, layer = group
+        if not layer:
+            return rows
+        return [(layer, row) for row in rows]
+
     def _flatten_low_entropy(object_, key, cur_depth, max_depth_inner):
         """
         For dict, list and set objects_ calls itself on the elements and for
-        other types assigns the object_ to
-        the corresponding key in the global flattened_dict
+        other types writes the object_ to
+        the corresponding key of the rows in the last group
 
         :param object_: object to flatten
         :param key: carries the concatenated key for the object_
         :return: None
         """
         cur_depth = cur_depth + 1  # increase current_depth
-        debug = 0
 
         # write latest child as value if max_depth exceeded
         if cur_depth > max_depth_inner:
-            global_max_record = int(max(list(
-                list_prebuilt_flattened_dict.keys())))
-            for d in list_prebuilt_flattened_dict[str(global_max_record)]:
-                d[key] = object_
+            _write(key, object_)
 
-        else:
-            # Empty object can't be iterated, take as is
-            if not object_:
-                global_max_record = int(max(list(
-                    list_prebuilt_flattened_dict.keys())))
-                for d in list_prebuilt_flattened_dict[str(global_max_record)]:
-                    d[key] = object_
-
-            # These object types support iteration
-            # dict always go into columns
-            elif isinstance(object_, dict):
-                first_key = list(object_.keys())[0]
-                # if only 1 child value, and child value
-                # not a dict or list, flatten immediately
-                if len(object_) == 1 \
-                        and not (isinstance(object_[first_key], dict)
-                                 or isinstance(object_[first_key], list)):
-                    global_max_record = int(max(list(
-                        list_prebuilt_flattened_dict.keys())))
-
-                    for d in list_prebuilt_flattened_dict[
-                        str(global_max_record)
-                    ]:
-                        d[key] = object_[first_key]
+        # Empty object can't be iterated, take as is
+        elif not object_:
+            _write(key, object_)
+
+        # These object types support iteration
+        # dict always go into columns
+        elif isinstance(object_, dict):
+            first_key = next(iter(object_))
+            # if only 1 child value, and child value
+            # not a dict or list, flatten immediately
+            if len(object_) == 1 \
+                    and not (isinstance(object_[first_key], dict)
+                             or isinstance(object_[first_key], list)):
+                _write(key, object_[first_key])
 
-                else:
-                    for object_key, val in \
-                            sorted(object_.items(),
-                                   key=lambda x:
-                                   (str(type(x[1])), len(str(x[1]))),
-                                   reverse=False):
-                        if not (not key and object_key in root_keys_to_ignore):
-                            _flatten_low_entropy(object_[object_key],
-                                                 _construct_key(key,
-                                                                separator,
-                                                                object_key),
-                                                 cur_depth, max_depth_inner)
-
-            # lists could go into rows, like in a relational database
-            elif isinstance(object_, list) or isinstance(object_, set):
-                if debug:
-                    print("\nparent key of list:",
-                          key, "| length: ",
-                          str(len(object_)))
-
-                # need to remember global list state when we entered
-                # this recursion
-                global_max_record_start = int(max(list(
-                    list_prebuilt_flattened_dict.keys())))
-                entry = copy.deepcopy(list_prebuilt_flattened_dict[
-                                          str(global_max_record_start)
-                                      ])
-
-                for index, item in enumerate(object_):
-
-                    if debug:
-                        print("  list key:", key,
-                              " index: " + str(index), "vals: ", item)
-
-                    sub = -1
-                    if isinstance(item, dict):
-                        first_value = list(item.values())[0]
-                        if isinstance(first_value, float):
-                            sub = first_value
-
-                    if not isnan(sub) and index < max_list_index:
-                        # start from second element, 1st element is like column
-                        if index > 0:
-                            global_max_record = int(max(list(
-                                list_prebuilt_flattened_dict.keys())))
-
-                            list_prebuilt_flattened_dict[
-                                str(global_max_record + 1)
-                            ] = copy.deepcopy(entry)
-
-                        _flatten_low_entropy(item, key, cur_depth,
-                                             max_depth_inner)
-                    else:
-                        pass
-
-                list_prebuilt_flattened_dict['0'] = \
-                    [subel for k, v in
-                     sorted(list_prebuilt_flattened_dict.items())
-                     for idx, subel in enumerate(v)]
-
-                for key in list(sorted(list_prebuilt_flattened_dict.keys())):
-                    if key != '0':
-                        del list_prebuilt_flattened_dict[key]
-                if debug:
-                    print("collapsed global list")
-
-            # Anything left take as is, assuming you hit the end of the line.
             else:
-                # in this case, there may be
-                # a list of prebuilt_flattened_dict by now
-                # so need to update them all.
-                global_max_record = int(max(list(
-                    list_prebuilt_flattened_dict.keys())))
+                for object_key, val in \
+                        sorted(object_.items(),
+                               key=lambda x:
+                               (str(type(x[1])), len(str(x[1]))),
+                               reverse=False):
+                    if not (not key and object_key in root_keys_to_ignore):
+                        _flatten_low_entropy(val,
+                                             _construct_key(key,
+                                                            separator,
+                                                            object_key),
+                                             cur_depth, max_depth_inner)
 
-                for d in list_prebuilt_flattened_dict[str(global_max_record)]:
-                    d[key] = object_
+        # lists could go into rows, like in a relational database
+        elif isinstance(object_, list) or isinstance(object_, set):
+            # need to remember the rows as they were when we entered
+            # this recursion, every list element after the first starts
+            # a new group from them
+            entry = _freeze(groups[-1])
+            groups[-1] = [entry, dict()]
 
-                    # decrease depth counter
-        cur_depth -= 1
+            for index, item in enumerate(object_):
+                sub = -1
+                if isinstance(item, dict) and item:
+                    first_value = next(iter(item.values()))
+                    if isinstance(first_value, float):
+                        sub = first_value
+
+                if not isnan(sub) and index < max_list_index:
+                    # start from second element, 1st element is like column
+                    if index > 0:
+                        groups.append([list(entry), dict()])
+
+                    _flatten_low_entropy(item, key, cur_depth,
+                                         max_depth_inner)
+
+            # collapse the groups into one
+            rows = [row for group in groups for row in _freeze(group)]
+            del groups[:]
+            groups.append([rows, dict()])
+
+        # Anything left take as is, assuming you hit the end of the line.
+        else:
+            # in this case, there may be
+            # a list of prebuilt_flattened_dict by now
+            # so need to update them all.
+            _write(key, object_)
 
     _flatten(nested_dict, None)
 
@@ -290,19 +381,21 @@ def flatten_preserve_lists(nested_dict, separator="_",
                                 in reskeys for char in key if char.isdigit()]))
     regex = '|'.join(unique_integers)
     regex += "|" + regex.replace(".", "")
-    unique_columns = list(set([re.sub("(" + regex + ")", "", key)
-                               for key in reskeys]))
+    regex = re.compile("(" + regex + ")")
+    unique_columns = list(set([regex.sub("", key) for key in reskeys]))
 
     # create global dict, now with unique column names
     prebuilt_flattened_dict = {column: None for column in unique_columns}
 
     # initialize global record list
-    list_prebuilt_flattened_dict = {'0': [prebuilt_flattened_dict]}
+    groups.append([[(prebuilt_flattened_dict, None)], dict()])
 
     _flatten_low_entropy(nested_dict, None, cur_depth=0,
                          max_depth_inner=max_depth)
 
-    return list_prebuilt_flattened_dict['0']
+    rows = _freeze(groups.pop())
+    for row in rows:
+        yield _row_values(row)
 
 
 def _unflatten_asserts(flat_dict, separator):
@@ -313,6 +406,49 @@ def _unflatten_asserts(flat_dict, separator):
                 for value in flat_dict.values())), "provided dict is not flat"
 
 
+def _unflatten_trie(flat_dict, separator, nodes=None):
+    """
+    Builds the hierarchy of a flattened dictionary in one pass over its keys
+    A key that is also the prefix of other keys would make the json
+    invalid, its value is dropped in favour of the dictionary of the
+    longer keys
+    :param flat_dict: a dictionary with no hierarchy
+    :param separator: a string that separates keys
+    :param nodes: list the (dictionary, parent, key in parent) triples of
+    the dictionaries created for the hierarchy are added to, in the order
+    they were created
+    :return: a dictionary with hierarchy
+    """
+    unflattened_dict = dict()
+
+    # Dictionary of every prefix walked so far. A dictionary created here
+    # always gets an item, so it is never replaced and siblings find their
+    # parent with one lookup
+    parents = {}
+
+    # Flat values can only be empty dictionaries, so a dictionary with items
+    # is one created here
+    for flat_key, value in flat_dict.items():
+        prefix, nested, key = flat_key.rpartition(separator)
+        dic = parents.get(prefix) if nested else unflattened_dict
+        if dic is None:
+            dic = unflattened_dict
+            for part in prefix.split(separator):
+                child = dic.get(part)
+                if not child or type(child) is not dict:
+                    child = dic[part] = dict()
+                    if nodes is not None:
+                        nodes.append((child, dic, part))
+                dic = child
+            parents[prefix] = dic
+
+        current = dic.get(key)
+        if not current or type(current) is not dict:
+            dic[key] = value
+
+    return unflattened_dict
+
+
 def unflatten(flat_dict, separator='_'):
     """
     Creates a hierarchical dictionary from a flattened dictionary
@@ -323,40 +459,33 @@ def unflatten(flat_dict, separator='_'):
     """
     _unflatten_asserts(flat_dict, separator)
 
-    # This global dictionary is mutated and returned
-    unflattened_dict = dict()
-
-    def _unflatten(dic, keys, value):
-        for key in keys[:-1]:
-            dic = dic.setdefault(key, {})
+    return _unflatten_trie(flat_dict, separator)
 
-        dic[keys[-1]] = value
 
-    list_keys = sorted(flat_dict.keys())
-    for i, item in enumerate(list_keys):
-        if i != len(list_keys) - 1:
-            if not list_keys[i + 1].startswith(list_keys[i]):
-                _unflatten(unflattened_dict, item.split(separator),
-                           flat_dict[item])
-            else:
-                pass  # if key contained in next key, json will be invalid.
-        else:
-            #  last element
-            _unflatten(unflattened_dict, item.split(separator),
-                       flat_dict[item])
-    return unflattened_dict
+def _list_indexes(object_):
+    """
+    Returns the keys of a dictionary ordered by their list index when they
+    are exactly the indexes 0 to len - 1, otherwise None
+    """
+    keys = [None] * len(object_)
+    for key in object_:
+        try:
+            index = int(key)
+        except (ValueError, TypeError):
+            return None
+        if index < 0 or index >= len(keys) or keys[index] is not None:
+            return None
+        keys[index] = key
+    return keys
 
 
 def unflatten_list(flat_dict, separator='_'):
     """
     Unflattens a dictionary, first assuming no lists exist and then tries to
     identify lists and replaces them
-    This is probably not very efficient and has not been tested extensively
-    Feel free to add test cases or rewrite the logic
-    Issues that stand out to me:
-    - Sorting all the keys in the dictionary, which specially for the root
-    dictionary can be a lot of keys
-    - Checking that numbers are consecutive is O(N) in number of keys
+    Only the dictionaries created for the hierarchy are checked, each one
+    once, children before their parents, so a list of lists is found in
+    the same pass
 
     :param flat_dict: dictionary with no hierarchy
     :param separator: a string that separates keys
@@ -365,45 +494,158 @@ def unflatten_list(flat_dict, separator='_'):
     _unflatten_asserts(flat_dict, separator)
 
     # First unflatten the dictionary assuming no lists exist
-    unflattened_dict = unflatten(flat_dict, separator)
-
-    def _convert_dict_to_list(object_, parent_object, parent_object_key):
-        if isinstance(object_, dict):
-            for key in object_:
-                if isinstance(object_[key], dict):
-                    _convert_dict_to_list(object_[key], object_, key)
-            try:
-                keys = [int(key) for key in object_]
-                keys.sort()
-            except (ValueError, TypeError):
-                keys = []
-            keys_len = len(keys)
-
-            if (keys_len > 0 and sum(keys) ==
-                    int(((keys_len - 1) * keys_len) / 2) and keys[0] == 0 and
-                    keys[-1] == keys_len - 1 and
-                    check_if_numbers_are_consecutive(keys)):
-
-                # The dictionary looks like a list so we're going to replace it
-                parent_object[parent_object_key] = []
-                for key_index, key in enumerate(keys):
-                    parent_object[parent_object_key].append(object_[str(key)])
-                    # The list item we just added might be a list itself
-                    # https://github.com/amirziai/flatten/issues/15
-                    _convert_dict_to_list(parent_object[parent_object_key][-1],
-                                          parent_object[parent_object_key],
-                                          key_index)
-
-    _convert_dict_to_list(unflattened_dict, None, None)
+    nodes = []
+    unflattened_dict = _unflatten_trie(flat_dict, separator, nodes)
+
+    for object_, parent_object, parent_object_key in reversed(nodes):
+        keys = _list_indexes(object_)
+        if keys is not None:
+            # The dictionary looks like a list so we're going to replace it
+            parent_object[parent_object_key] = [object_[key] for key in keys]
+
     return unflattened_dict
 
 
-def cli(input_stream=sys.stdin, output_stream=sys.stdout):
-    raw = input_stream.read()
-    input_json = json.loads(raw)
-    output = json.dumps(flatten(input_json))
-    output_stream.write('{}\n'.format(output))
+_json_decoder = json.JSONDecoder()
+
+
+def _iter_documents(line):
+    """
+    Yields the JSON documents of a line, Firehose backups hold records
+    written back to back without a newline between them
+    """
+    end = len(line)
+    index = 0
+    while True:
+        while index < end and line[index].isspace():
+            index += 1
+        if index == end:
+            return
+        document, index = _json_decoder.raw_decode(line, index)
+        yield document
+
+
+def _flatten_line(numbered_line, separator='_', root_keys_to_ignore=set()):
+    """
+    Flattens every JSON document of a line
+    :param numbered_line: tuple of the line number and the line
+    :return: tuple of the line number, the number of documents, their
+    flattened JSON, one per line, and the error when a document of the
+    line is not valid JSON or not an object, the line is then skipped
+    """
+    number, line = numbered_line
+    try:
+        outputs = [json.dumps(flatten(document, separator,
+                                      root_keys_to_ignore))
+                   for document in _iter_documents(line)]
+    except (ValueError, AssertionError) as e:
+        return number, 0, '', str(e) or 'not a JSON object'
+    if not outputs:
+        return number, 0, '', None
+    outputs.append('')
+    return number, len(outputs) - 1, '\n'.join(outputs), None
+
+
+def _parse_args(args):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Flattens JSON documents read from stdin')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='stream newline delimited JSON, one flattened '
+                             'document per output line')
+    parser.add_argument('--separator', default='_')
+    parser.add_argument('--root-keys-to-ignore', default='',
+                        help='comma separated root keys to leave out')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes flattening lines with --ndjson')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='lines sent to a worker at a time')
+    parser.add_argument('--unordered', action='store_true',
+                        help='write lines as workers finish them')
+    parser.add_argument('--report', action='store_true',
+                        help='write the throughput to stderr')
+    return parser.parse_args(args)
+
+
+def _flatten_stream(input_stream, output_stream, flatten_line, workers=1,
+                    chunk_size=256, unordered=False, error_stream=None):
+    """
+    Flattens a newline delimited JSON stream, reading lines as they are
+    consumed so the input never has to fit in memory. A line that can not
+    be flattened is skipped and reported to error_stream with its number
+    :return: tuple of the number of documents written and of lines skipped
+    """
+    error_stream = sys.stderr if error_stream is None else error_stream
+    numbered_lines = enumerate(input_stream, 1)
+
+    def write(results):
+        count = skipped = 0
+        for number, documents, output, error in results:
+            if error is not None:
+                error_stream.write('line {}: {}\n'.format(number, error))
+                skipped += 1
+            count += documents
+            output_stream.write(output)
+        return count, skipped
+
+    if workers <= 1:
+        return write(map(flatten_line, numbered_lines))
+
+    import multiprocessing
+
+    with multiprocessing.Pool(workers) as pool:
+        mapper = pool.imap_unordered if unordered else pool.imap
+        return write(mapper(flatten_line, numbered_lines, chunk_size))
+
+
+def cli(input_stream=None, output_stream=None, args=None):
+    """
+    Flattens the JSON read from input_stream to output_stream
+    :param input_stream: defaults to sys.stdin at the time of the call
+    :param output_stream: defaults to sys.stdout at the time of the call
+    :param args: command line options, defaults to sys.argv[1:]. Library
+    callers pass [] to ignore the arguments of their own process
+    """
+    if input_stream is None:
+        input_stream = sys.stdin
+    if output_stream is None:
+        output_stream = sys.stdout
+    if args is None:
+        args = sys.argv[1:]
+
+    options = _parse_args(args)
+    root_keys_to_ignore = set(key for key in
+                              options.root_keys_to_ignore.split(',') if key)
+
+    if not options.ndjson:
+        raw = input_stream.read()
+        input_json = json.loads(raw)
+        output = json.dumps(flatten(input_json, options.separator,
+                                    root_keys_to_ignore))
+        output_stream.write('{}\n'.format(output))
+        output_stream.flush()
+        return
+
+    import time
+    import functools
+
+    flatten_line = functools.partial(
+        _flatten_line, separator=options.separator,
+        root_keys_to_ignore=root_keys_to_ignore)
+
+    start = time.time()
+    count, skipped = _flatten_stream(input_stream, output_stream,
+                                     flatten_line, options.workers,
+                                     options.chunk_size, options.unordered)
     output_stream.flush()
+    elapsed = time.time() - start
+
+    if options.report:
+        sys.stderr.write('{} records in {:.2f} s, {:.0f} records/s, '
+                         '{} bad lines\n'.format(
+                             count, elapsed, count / elapsed if elapsed else 0,
+                             skipped))
 
 
 if __name__ == '__main__':
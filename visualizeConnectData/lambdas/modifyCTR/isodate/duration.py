@@ -30,7 +30,7 @@ This module defines a Duration class.
 The class Duration allows to define durations in years and months and can be
 used as limited replacement for timedelta objects.
 '''
-from datetime import timedelta
+from datetime import timedelta, datetime
 from decimal import Decimal, ROUND_FLOOR
 
 
@@ -43,6 +43,9 @@ def fquotmod(val, low, high):
     # divmod for Decimal uses truncate instead of floor as builtin
     # divmod, so we have to do it manually here.
     a, b = val - low, high - low
+    if type(a) is int and type(b) is int:
+        div, mod = divmod(a, b)
+        return div, mod + low
     div = (a / b).to_integral(ROUND_FLOOR)
     mod = a - div * b
     # if we were not usig Decimal, it would look like this.
@@ -51,6 +54,36 @@ def fquotmod(val, low, high):
     return int(div), mod
 
 
+def whole_or_decimal(value):
+    '''
+    Converts years or months to int if they are given as a whole number,
+    and to Decimal otherwise.
+
+    Integers keep the arithmetic of date calculations free of Decimal
+    operations, a Decimal written with fractional digits (like 4.0) stays a
+    Decimal so it formats the same.
+    '''
+    if type(value) is int:
+        return value
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    if value.is_finite() and value.as_tuple().exponent >= 0:
+        return int(value)
+    return value
+
+
+def new_duration(years, months, tdelta):
+    '''
+    Creates a Duration from its components without going through __init__,
+    which would build a timedelta only to replace it.
+    '''
+    duration = Duration.__new__(Duration)
+    duration.years = whole_or_decimal(years)
+    duration.months = whole_or_decimal(months)
+    duration.tdelta = tdelta
+    return duration
+
+
 def max_days_in_month(year, month):
     '''
     Determines the number of days of a specific month in a specific year.
@@ -85,32 +118,42 @@ class Duration(object):
 
     The algorithm to add a duration to a date is defined at
     http://www.w3.org/TR/xmlschema-2/#adding-durations-to-dateTimes
+
+    Whole years and months are kept as int, fractional ones as Decimal.
     '''
 
+    __slots__ = ('months', 'years', 'tdelta')
+
     def __init__(self, days=0, seconds=0, microseconds=0, milliseconds=0,
                  minutes=0, hours=0, weeks=0, months=0, years=0):
         '''
         Initialise this Duration instance with the given parameters.
         '''
-        if not isinstance(months, Decimal):
-            months = Decimal(str(months))
-        if not isinstance(years, Decimal):
-            years = Decimal(str(years))
-        self.months = months
-        self.years = years
+        self.months = whole_or_decimal(months)
+        self.years = whole_or_decimal(years)
         self.tdelta = timedelta(days, seconds, microseconds, milliseconds,
                                 minutes, hours, weeks)
 
     def __getstate__(self):
-        return self.__dict__
+        # the same state as before __slots__, so pickles load either way
+        return {'months': self.months, 'years': self.years,
+                'tdelta': self.tdelta}
 
     def __setstate__(self, state):
-        self.__dict__.update(state)
+        if isinstance(state, tuple):
+            # (None, slots) from pickling without __getstate__
+            state = state[1]
+        self.months = whole_or_decimal(state['months'])
+        self.years = whole_or_decimal(state['years'])
+        self.tdelta = state['tdelta']
 
     def __getattr__(self, name):
         '''
         Provide direct access to attributes of included timedelta instance.
         '''
+        if name in Duration.__slots__:
+            # not set yet, for example while unpickling
+            raise AttributeError(name)
         return getattr(self.tdelta, name)
 
     def __str__(self):
@@ -150,9 +193,7 @@ class Duration(object):
 
         Returns a new Duration instance with all it's negated.
         """
-        negduration = Duration(years=-self.years, months=-self.months)
-        negduration.tdelta = -self.tdelta
-        return negduration
+        return new_duration(-self.years, -self.months, -self.tdelta)
 
     def __add__(self, other):
         '''
@@ -160,21 +201,19 @@ class Duration(object):
         objects.
         '''
         if isinstance(other, Duration):
-            newduration = Duration(years=self.years + other.years,
-                                   months=self.months + other.months)
-            newduration.tdelta = self.tdelta + other.tdelta
-            return newduration
+            return new_duration(self.years + other.years,
+                                self.months + other.months,
+                                self.tdelta + other.tdelta)
+        if isinstance(other, timedelta):
+            return new_duration(self.years, self.months, self.tdelta + other)
         try:
             # try anything that looks like a date or datetime
             # 'other' has attributes year, month, day
             # and relies on 'timedelta + other' being implemented
-            if (not(float(self.years).is_integer() and
-                    float(self.months).is_integer())):
-                raise ValueError('fractional years or months not supported'
-                                 ' for date calculations')
-            newmonth = other.month + self.months
+            years, months = self.whole_years_months()
+            newmonth = other.month + months
             carry, newmonth = fquotmod(newmonth, 1, 13)
-            newyear = other.year + self.years + carry
+            newyear = other.year + years + carry
             maxdays = max_days_in_month(newyear, newmonth)
             if other.day > maxdays:
                 newday = maxdays
@@ -189,9 +228,7 @@ class Duration(object):
         try:
             # try if other is a timedelta
             # relies on timedelta + timedelta supported
-            newduration = Duration(years=self.years, months=self.months)
-            newduration.tdelta = self.tdelta + other
-            return newduration
+            return new_duration(self.years, self.months, self.tdelta + other)
         except AttributeError:
             # ignore ... other probably was not a timedelta compatible object
             pass
@@ -200,13 +237,23 @@ class Duration(object):
 
     __radd__ = __add__
 
+    def whole_years_months(self):
+        '''
+        Returns years and months as int for date calculations.
+        '''
+        years, months = self.years, self.months
+        if type(years) is int and type(months) is int:
+            return years, months
+        if (not(float(years).is_integer() and
+                float(months).is_integer())):
+            raise ValueError('fractional years or months not supported'
+                             ' for date calculations')
+        return int(years), int(months)
+
     def __mul__(self, other):
         if isinstance(other, int):
-            newduration = Duration(
-                years=self.years * other,
-                months=self.months * other)
-            newduration.tdelta = self.tdelta * other
-            return newduration
+            return new_duration(self.years * other, self.months * other,
+                                self.tdelta * other)
         return NotImplemented
 
     __rmul__ = __mul__
@@ -217,15 +264,12 @@ class Duration(object):
         objects.
         '''
         if isinstance(other, Duration):
-            newduration = Duration(years=self.years - other.years,
-                                   months=self.months - other.months)
-            newduration.tdelta = self.tdelta - other.tdelta
-            return newduration
+            return new_duration(self.years - other.years,
+                                self.months - other.months,
+                                self.tdelta - other.tdelta)
         try:
             # do maths with our timedelta object ....
-            newduration = Duration(years=self.years, months=self.months)
-            newduration.tdelta = self.tdelta - other
-            return newduration
+            return new_duration(self.years, self.months, self.tdelta - other)
         except TypeError:
             # looks like timedelta - other is not implemented
             pass
@@ -246,19 +290,15 @@ class Duration(object):
               instead of all the current code
         '''
         if isinstance(other, timedelta):
-            tmpdur = Duration()
-            tmpdur.tdelta = other
-            return tmpdur - self
+            return new_duration(-self.years, -self.months,
+                                other - self.tdelta)
         try:
             # check if other behaves like a date/datetime object
             # does it have year, month, day and replace?
-            if (not(float(self.years).is_integer() and
-                    float(self.months).is_integer())):
-                raise ValueError('fractional years or months not supported'
-                                 ' for date calculations')
-            newmonth = other.month - self.months
+            years, months = self.whole_years_months()
+            newmonth = other.month - months
             carry, newmonth = fquotmod(newmonth, 1, 13)
-            newyear = other.year - self.years + carry
+            newyear = other.year - years + carry
             maxdays = max_days_in_month(newyear, newmonth)
             if other.day > maxdays:
                 newday = maxdays
@@ -316,6 +356,10 @@ class Duration(object):
             raise ValueError("start or end required")
         if start is not None and end is not None:
             raise ValueError("only start or end allowed")
+        if (self.years == 0 and self.months == 0 and
+                isinstance(start if start is not None else end, datetime)):
+            # no calendar maths, for datetimes this is the timedelta itself
+            return self.tdelta
         if start is not None:
             return (start + self) - start
         return end - (end - self)
@@ -32,6 +32,7 @@ format timedelta or Duration instances as ISO conforming strings.
 '''
 from datetime import timedelta
 from decimal import Decimal
+from functools import lru_cache
 import re
 
 from six import string_types
@@ -53,6 +54,32 @@ ISO8601_PERIOD_REGEX = re.compile(
     r"(?P<seconds>[0-9]+([,.][0-9]+)?S)?)?$")
 # regular expression to parse ISO duartion strings.
 
+ISO8601_SIMPLE_PERIOD_REGEX = re.compile(
+    r"^P(?!$)"
+    r"(?:(?P<days>[0-9]{1,9})D)?"
+    r"(?:T(?:(?P<hours>[0-9]{1,9})H)?"
+    r"(?:(?P<minutes>[0-9]{1,9})M)?"
+    r"(?:(?P<seconds>[0-9]{1,9})S)?)?$")
+# unsigned durations with whole days, hours, minutes and seconds only. These
+# always give a timedelta, and up to 9 digits the integers give the same
+# result as the floats of the full parser.
+
+
+@lru_cache(maxsize=4096)
+def _parse_simple_duration(datestring):
+    """
+    Parses PnDTnHnMnS durations with integer components into a timedelta.
+
+    Returns None for any other form, which is left to the full parser.
+    Results are memoized per string, timedelta instances are immutable.
+    """
+    match = ISO8601_SIMPLE_PERIOD_REGEX.match(datestring)
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return timedelta(days=int(days or 0), hours=int(hours or 0),
+                     minutes=int(minutes or 0), seconds=int(seconds or 0))
+
 
 def parse_duration(datestring):
     """
@@ -84,6 +111,9 @@ def parse_duration(datestring):
     """
     if not isinstance(datestring, string_types):
         raise TypeError("Expecting a string %r" % datestring)
+    ret = _parse_simple_duration(datestring)
+    if ret is not None:
+        return ret
     match = ISO8601_PERIOD_REGEX.match(datestring)
     if not match:
         # try alternative format:
@@ -120,52 +120,96 @@ STRF_D_MAP = {'%d': lambda tdt, yds: '%02d' % tdt.days,
               '%%': lambda tdt, yds: '%'}
 
 
+def _strf_period(tdt, yds):
+    '''
+    ISO8601 duration format for the %P format command.
+    '''
+    ret = []
+    if isinstance(tdt, Duration):
+        if tdt.years:
+            ret.append('%sY' % abs(tdt.years))
+        if tdt.months:
+            ret.append('%sM' % abs(tdt.months))
+    usecs = abs((tdt.days * 24 * 60 * 60 + tdt.seconds) * 1000000 +
+                tdt.microseconds)
+    seconds, usecs = divmod(usecs, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        ret.append('%sD' % days)
+    if hours or minutes or seconds or usecs:
+        ret.append('T')
+        if hours:
+            ret.append('%sH' % hours)
+        if minutes:
+            ret.append('%sM' % minutes)
+        if seconds or usecs:
+            if usecs:
+                ret.append(("%d.%06d" % (seconds, usecs)).rstrip('0'))
+            else:
+                ret.append("%d" % seconds)
+            ret.append('S')
+    # at least one component has to be there.
+    return ret and ''.join(ret) or '0D'
+
+
+def _strf_weeks(tdt, yds):
+    '''
+    ISO8601 duration format in weeks for the %p format command.
+    '''
+    return str(abs(tdt.days // 7)) + 'W'
+
+
+STRF_D_COMMANDS = dict(STRF_D_MAP, **{'%P': _strf_period,
+                                      '%p': _strf_weeks})
+
+STRF_DT_REGEX = re.compile('%d|%f|%H|%j|%m|%M|%S|%w|%W|%Y|%C|%z|%Z|%h|%%')
+STRF_D_REGEX = re.compile('%d|%f|%H|%m|%M|%S|%W|%Y|%C|%%|%P|%p')
+
+# Compiled format strings, the plan of a format is looked up by the format
+# string in the cache of its kind. A cache is emptied when it holds
+# STRF_PLAN_CACHE_SIZE plans.
+STRF_PLAN_CACHE_SIZE = 1000
+STRF_DT_PLAN_CACHE = {}
+STRF_D_PLAN_CACHE = {}
+
+
+def _compile_format(format, regex, commands, cache):
+    '''
+    Compile a format string into a plan and keep it in cache.
+
+    The plan is a %-style template holding the literal text of format and
+    a tuple of the functions filling its fields, so that formatting a value
+    only runs the functions of the format commands.
+    '''
+    plan = cache.get(format)
+    if plan is None:
+        template = []
+        fields = []
+        pos = 0
+        for match in regex.finditer(format):
+            template.append(format[pos:match.start()].replace('%', '%%'))
+            template.append('%s')
+            fields.append(commands[match.group(0)])
+            pos = match.end()
+        template.append(format[pos:].replace('%', '%%'))
+        plan = (''.join(template), tuple(fields))
+        if len(cache) >= STRF_PLAN_CACHE_SIZE:
+            cache.clear()
+        cache[format] = plan
+    return plan
+
+
 def _strfduration(tdt, format, yeardigits=4):
     '''
     this is the work method for timedelta and Duration instances.
 
     see strftime for more details.
     '''
-    def repl(match):
-        '''
-        lookup format command and return corresponding replacement.
-        '''
-        if match.group(0) in STRF_D_MAP:
-            return STRF_D_MAP[match.group(0)](tdt, yeardigits)
-        elif match.group(0) == '%P':
-            ret = []
-            if isinstance(tdt, Duration):
-                if tdt.years:
-                    ret.append('%sY' % abs(tdt.years))
-                if tdt.months:
-                    ret.append('%sM' % abs(tdt.months))
-            usecs = abs((tdt.days * 24 * 60 * 60 + tdt.seconds) * 1000000 +
-                        tdt.microseconds)
-            seconds, usecs = divmod(usecs, 1000000)
-            minutes, seconds = divmod(seconds, 60)
-            hours, minutes = divmod(minutes, 60)
-            days, hours = divmod(hours, 24)
-            if days:
-                ret.append('%sD' % days)
-            if hours or minutes or seconds or usecs:
-                ret.append('T')
-                if hours:
-                    ret.append('%sH' % hours)
-                if minutes:
-                    ret.append('%sM' % minutes)
-                if seconds or usecs:
-                    if usecs:
-                        ret.append(("%d.%06d" % (seconds, usecs)).rstrip('0'))
-                    else:
-                        ret.append("%d" % seconds)
-                    ret.append('S')
-            # at least one component has to be there.
-            return ret and ''.join(ret) or '0D'
-        elif match.group(0) == '%p':
-            return str(abs(tdt.days // 7)) + 'W'
-        return match.group(0)
-    return re.sub('%d|%f|%H|%m|%M|%S|%W|%Y|%C|%%|%P|%p', repl,
-                  format)
+    template, fields = _compile_format(format, STRF_D_REGEX,
+                                       STRF_D_COMMANDS, STRF_D_PLAN_CACHE)
+    return template % tuple([field(tdt, yeardigits) for field in fields])
 
 
 def _strfdt(tdt, format, yeardigits=4):
@@ -174,15 +218,9 @@ def _strfdt(tdt, format, yeardigits=4):
 
     see strftime for more details.
     '''
-    def repl(match):
-        '''
-        lookup format command and return corresponding replacement.
-        '''
-        if match.group(0) in STRF_DT_MAP:
-            return STRF_DT_MAP[match.group(0)](tdt, yeardigits)
-        return match.group(0)
-    return re.sub('%d|%f|%H|%j|%m|%M|%S|%w|%W|%Y|%C|%z|%Z|%h|%%', repl,
-                  format)
+    template, fields = _compile_format(format, STRF_DT_REGEX,
+                                       STRF_DT_MAP, STRF_DT_PLAN_CACHE)
+    return template % tuple([field(tdt, yeardigits) for field in fields])
 
 
 def strftime(tdt, format, yeardigits=4):
@@ -39,6 +39,12 @@ TZ_REGEX = r"(?P<tzname>(Z|(?P<tzsign>[+-])"\
 
 TZ_RE = re.compile(TZ_REGEX)
 
+# FixedOffset instances handed out by build_tzinfo, keyed by
+# (sign, hour, minute, name), so that all values parsed with the same offset
+# share one tzinfo. The cache is emptied when it holds TZ_CACHE_SIZE entries.
+TZ_CACHE_SIZE = 1000
+TZ_CACHE = {}
+
 
 def build_tzinfo(tzname, tzsign='+', tzhour=0, tzmin=0):
     '''
@@ -47,14 +53,22 @@ def build_tzinfo(tzname, tzsign='+', tzhour=0, tzmin=0):
     tzname:
       'Z'       ... return UTC
       '' | None ... return None
-      other     ... return FixedOffset
+      other     ... return FixedOffset, the same instance for equal
+                    parameters
     '''
     if tzname is None or tzname == '':
         return None
     if tzname == 'Z':
         return UTC
     tzsign = ((tzsign == '-') and -1) or 1
-    return FixedOffset(tzsign * tzhour, tzsign * tzmin, tzname)
+    key = (tzsign, tzhour, tzmin, tzname)
+    tzinfo = TZ_CACHE.get(key)
+    if tzinfo is None:
+        tzinfo = FixedOffset(tzsign * tzhour, tzsign * tzmin, tzname)
+        if len(TZ_CACHE) >= TZ_CACHE_SIZE:
+            TZ_CACHE.clear()
+        TZ_CACHE[key] = tzinfo
+    return tzinfo
 
 
 def parse_tzinfo(tzstring):
@@ -68,6 +82,10 @@ def parse_tzinfo(tzstring):
       +-hh:mm extended hours and minutes
       +-hh    hours
     '''
+    if tzstring == 'Z':
+        return UTC
+    if tzstring == '+00:00':
+        return build_tzinfo(tzstring)
     match = TZ_RE.match(tzstring)
     if match:
         groups = match.groupdict()
@@ -30,7 +30,7 @@ Collect all test suites into one TestSuite instance.
 
 import unittest
 from isodate.tests import (test_date, test_time, test_datetime, test_duration,
-                           test_strf, test_pickle)
+                           test_strf, test_pickle, test_tzinfo)
 
 
 def test_suite():
@@ -44,6 +44,7 @@ def test_suite():
         test_duration.test_suite(),
         test_strf.test_suite(),
         test_pickle.test_suite(),
+        test_tzinfo.test_suite(),
         ])
 
 
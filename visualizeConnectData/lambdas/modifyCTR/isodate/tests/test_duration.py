@@ -305,6 +305,23 @@ class DurationTest(unittest.TestCase):
         '''
         self.assertRaises(ISO8601Error, parse_duration, 'T10:10:10')
 
+    def test_simple(self):
+        '''
+        Test the fast path for durations of whole days, hours, minutes and
+        seconds against the full parser.
+        '''
+        self.assertEqual(parse_duration('PT90M'), timedelta(minutes=90))
+        self.assertEqual(parse_duration('P0D'), timedelta(0))
+        self.assertEqual(parse_duration('P1DT'), timedelta(days=1))
+        self.assertEqual(parse_duration('PT'), timedelta(0))
+        self.assertEqual(parse_duration('PT1000000000S'),
+                         timedelta(seconds=1000000000))
+        self.assertEqual(parse_duration('PT1.5M'), timedelta(seconds=90))
+        self.assertTrue(parse_duration('PT1H') is parse_duration('PT1H'))
+        self.assertRaises(ISO8601Error, parse_duration, 'P')
+        self.assertRaises(ISO8601Error, parse_duration, 'PT1M1H')
+        self.assertRaises(OverflowError, parse_duration, 'P999999999DT24H')
+
     def test_repr(self):
         '''
         Test __repr__ and __str__ for Duration objects.
@@ -38,6 +38,31 @@ class TestPickle(unittest.TestCase):
         self.assertEqual(len(failed), 0, "pickle protos failed: %s" %
                          str(failed))
 
+    def test_pickle_duration_dict(self):
+        '''
+        Durations pickled before Duration used __slots__ can be loaded.
+        '''
+        from decimal import Decimal
+        from isodate.duration import Duration
+        # pickle.dumps(Duration(days=1, hours=2, months=3, years=4), 2)
+        pikl = (b'\x80\x02cisodate.duration\nDuration\nq\x00)\x81q\x01}q\x02('
+                b'X\x06\x00\x00\x00monthsq\x03cdecimal\nDecimal\nq\x04X\x01'
+                b'\x00\x00\x003q\x05\x85q\x06Rq\x07X\x05\x00\x00\x00yearsq\x08'
+                b'h\x04X\x01\x00\x00\x004q\t\x85q\nRq\x0bX\x06\x00\x00\x00'
+                b'tdeltaq\x0ccdatetime\ntimedelta\nq\rK\x01M \x1cK\x00\x87q'
+                b'\x0eRq\x0fub.')
+        dur = pickle.loads(pikl)
+        self.assertEqual(dur, Duration(days=1, hours=2, months=3, years=4))
+        self.assertEqual(dur.years, 4)
+        # pickle.dumps(Duration(years=Decimal('0.5')), 2)
+        pikl = (b'\x80\x02cisodate.duration\nDuration\nq\x00)\x81q\x01}q\x02('
+                b'X\x06\x00\x00\x00monthsq\x03cdecimal\nDecimal\nq\x04X\x01'
+                b'\x00\x00\x000q\x05\x85q\x06Rq\x07X\x05\x00\x00\x00yearsq\x08'
+                b'h\x04X\x03\x00\x00\x000.5q\t\x85q\nRq\x0bX\x06\x00\x00\x00'
+                b'tdeltaq\x0ccdatetime\ntimedelta\nq\rK\x00K\x00K\x00\x87q\x0e'
+                b'Rq\x0fub.')
+        self.assertEqual(pickle.loads(pikl).years, Decimal('0.5'))
+
     def test_pickle_utc(self):
         '''
         isodate.UTC objects remain the same after pickling.
@@ -32,7 +32,8 @@ import time
 from datetime import datetime, timedelta
 from isodate import strftime
 from isodate import LOCAL
-from isodate import DT_EXT_COMPLETE
+from isodate import DT_EXT_COMPLETE, D_DEFAULT, D_WEEK
+from isodate import Duration
 from isodate import tzinfo
 
 
@@ -48,6 +49,16 @@ TEST_CASES = ((datetime(2012, 12, 25, 13, 30, 0, 0, LOCAL), DT_EXT_COMPLETE,
               (datetime(2012, 10, 12, 8, 29, 46, 691780),
                "%Y-%m-%dT%H:%M:%S.%f",
                "2012-10-12T08:29:46.691780"),
+              # literal text and escaped percent signs
+              (datetime(2012, 10, 12, 8, 29, 46), "%Y%%%m 100% %%d %x",
+               "2012%10 100% %d %x"),
+              # durations
+              (timedelta(days=1, hours=2, seconds=5), D_DEFAULT,
+               "P1DT2H5S"),
+              (Duration(years=1, months=2, days=3), D_DEFAULT, "P1Y2M3D"),
+              (timedelta(days=21), D_WEEK, "P3W"),
+              (timedelta(days=3, hours=4, minutes=5, seconds=6),
+               "%d days %H:%M:%S %%P", "03 days 04:05:06 %P"),
               )
 
 
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime, timedelta
+
+from isodate import parse_tzinfo, parse_time, parse_datetime, UTC
+from isodate.isotzinfo import build_tzinfo
+
+# time zone designators and the offset from UTC in minutes they stand for
+TZ_CASES = (('+00:00', 0), ('+0000', 0), ('+00', 0), ('-00:00', 0),
+            ('+01:00', 60), ('+0100', 60), ('+01', 60), ('-05:00', -300),
+            ('-0530', -330), ('+05:30', 330), ('-00:30', -30),
+            ('+00:30', 30), ('+14:00', 840))
+
+
+class TestTzinfo(unittest.TestCase):
+    '''
+    Test the tzinfo instances returned by parse_tzinfo and build_tzinfo.
+    '''
+
+    def test_parse(self):
+        '''
+        Parsed designators have the offset and name of the designator.
+        '''
+        dt = datetime(2012, 10, 26, 9, 33)
+        for tzstring, minutes in TZ_CASES:
+            tzinfo = parse_tzinfo(tzstring)
+            self.assertEqual(tzinfo.utcoffset(dt),
+                             timedelta(minutes=minutes), tzstring)
+            self.assertEqual(tzinfo.dst(dt), timedelta(0))
+            self.assertEqual(tzinfo.tzname(dt), tzstring)
+
+    def test_identity(self):
+        '''
+        Equal designators return the same tzinfo instance.
+        '''
+        for tzstring, minutes in TZ_CASES:
+            self.assertTrue(parse_tzinfo(tzstring) is parse_tzinfo(tzstring))
+        self.assertFalse(parse_tzinfo('+00:30') is parse_tzinfo('-00:30'))
+        self.assertFalse(parse_tzinfo('+01:00') is parse_tzinfo('+0100'))
+        self.assertTrue(parse_time('10:15+02:00').tzinfo is
+                        parse_datetime('2012-10-26T11:00+02:00').tzinfo)
+
+    def test_shortcuts(self):
+        '''
+        Z and +00:00 give the same results as the regular expression.
+        '''
+        self.assertTrue(parse_tzinfo('Z') is UTC)
+        self.assertTrue(parse_tzinfo('+00:00') is
+                        build_tzinfo('+00:00', '+', 0, 0))
+        self.assertTrue(parse_tzinfo('') is None)
+        self.assertTrue(parse_tzinfo('Z0') is UTC)
+        self.assertTrue(parse_tzinfo('x') is None)
+
+
+def test_suite():
+    '''
+    Construct a TestSuite instance for all test cases.
+    '''
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestTzinfo))
+    return suite
+
+
+# load_tests Protocol
+def load_tests(loader, tests, pattern):
+    return test_suite()
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
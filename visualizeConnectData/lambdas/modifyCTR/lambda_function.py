@@ -1,21 +1,105 @@
 import os
+import gzip
 import json
 import boto3
+import base64
 import botocore
 import logging
-import datetime
+import threading
 import isodate #pip3 install isodate --target .
+import ctr_parquet
+import ctr_columns
+import ctr_transform
+import ctr_timestamps
+import ctr_geo
+import ctr_enrichment
  
 from urllib.parse import unquote
+from collections import OrderedDict
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from flatten_json import flatten #pip3 install flatten_json==0.1.7 --target .
  
 logger = logging.getLogger()
 logger.setLevel(os.environ['LOG_LEVEL'])
 
-s3Resource = boto3.resource('s3')
+# serial processes one record at a time, batch uses a bounded pool of workers
+processingMode = os.environ.get('ProcessingMode', 'batch')
+maxWorkers = int(os.environ.get('MaxWorkers', '16'))
+# Objects of an event (a burst of Firehose deliveries batched through SQS) are processed by their own bounded pool,
+# their records share the pool of workers
+maxObjectWorkers = int(os.environ.get('MaxObjectWorkers', '4'))
+batchSize = int(os.environ.get('BatchSize', '500'))
+lastUpdateCacheSize = int(os.environ.get('LastUpdateCacheSize', '100000'))
+dedupe = os.environ.get('DedupeRecords', 'true').lower() == 'true'
+# json writes one object per CTR, parquet writes one file per Firehose object
+outputFormat = os.environ.get('OutputFormat', 'json')
+parquetCompression = os.environ.get('ParquetCompression', 'snappy')
+# local resolves cities from the bundled cities.tsv, remote posts them to GeoEndpoint
+geoBackend = os.environ.get('GeoBackend', 'local')
+geoEndpoint = os.environ.get('GeoEndpoint')
+geoCacheSize = int(os.environ.get('GeoCacheSize', '10000'))
+# Fused mode writes the modified CTRs through Firehose, the bucket is recorded as their source
+ctrBucket = os.environ.get('CTRBucket')
+# Firehose writes each record under the date of its InitiationTimestamp, returned with the record as partition keys
+dynamicPartitioning = os.environ.get('DynamicPartitioning', 'false').lower() == 'true'
+
+# S3 lower cases user metadata keys
+LAST_UPDATE_METADATA_KEY = 'lastupdatetimestamp'
+STREAM_CHUNK_SIZE = 64 * 1024
+# Firehose names GZIP objects with the .gz extension, objects copied in by other tools may only have the encoding
+# or only start with the gzip magic number
+GZIP_EXTENSION = '.gz'
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Clients are thread safe, resources are not. The connection pool is sized so every worker keeps a connection
+s3Client = boto3.client('s3', config=Config(max_pool_connections=maxWorkers + maxObjectWorkers))
+
+class LastUpdateIndex:
+    # LastUpdateTimestamp of the modified objects this container has read or written, kept across warm invocations.
+    # Timestamps in S3 only move forward, so a cached value can be used to skip a record but never to write one
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.timestamps = OrderedDict()
+        self.lock = threading.Lock()
+        
+    def get(self, key):
+        with self.lock:
+            timestamp = self.timestamps.get(key)
+            if timestamp is not None:
+                self.timestamps.move_to_end(key)
+            return timestamp
+            
+    def put(self, key, timestamp):
+        with self.lock:
+            current = self.timestamps.get(key)
+            if current is None or timestamp > current:
+                self.timestamps[key] = timestamp
+            self.timestamps.move_to_end(key)
+            
+            while len(self.timestamps) > self.maxSize:
+                self.timestamps.popitem(last=False)
+                
+lastUpdateIndex = LastUpdateIndex(lastUpdateCacheSize)
+
+class KeyLocks:
+    # The freshness check and the write of a modified object are done holding the lock of its key, so versions of a
+    # contact processed by different workers, from the same or from different objects of the event, are written one
+    # after the other and an older version can not overwrite a newer one. Keys share a fixed number of locks, a worker
+    # holds one lock at a time
+    def __init__(self, size):
+        self.locks = [threading.Lock() for x in range(size)]
+        
+    def lockFor(self, key):
+        return self.locks[hash(key) % len(self.locks)]
+        
+modifiedKeyLocks = KeyLocks(256)
+
+# The index is loaded once per container, resolved cities are cached across warm invocations
+geoEnricher = ctr_geo.createEnricher(geoBackend, geoEndpoint, geoCacheSize)
 
 #This requires Kineses to add an end of line character after each record
-#This is triggered by an S3 create event
+#This is triggered by an S3 create event, or by SQS messages holding S3 create events
 def lambda_handler(event, context):
     try:
         logger.info('Start {}, Version {}'.format(context.function_name, context.function_version))
@@ -23,29 +107,91 @@ def lambda_handler(event, context):
         
         ctrModifiedFolder = os.environ['CTRModifiedS3Folder']
         
-        bucketName, objectKey = parseEvent(event)
+        s3Objects, failedMessages = parseEvent(event)
         
-        records = parseObject (bucketName, objectKey)
-        for record in records:
-            if (record['AWSContactTraceRecordFormatVersion'] != '2017-03-10'):
-                raise Exception('Invalid CTR version')
+        # Objects are processed together, versions of a contact in different objects are ordered by modifiedKeyLocks
+        enrichmentStage.resetCounters()
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            with ThreadPoolExecutor(max_workers=maxObjectWorkers) as objectExecutor:
+                summaries = list(objectExecutor.map(
+                    lambda s3Object: processObject(executor, s3Object, ctrModifiedFolder),
+                    s3Objects
+                ))
                 
-            mok = modifiedObjectKey(record, ctrModifiedFolder, objectKey)
+        summary = summarizeObjects(summaries)
+        summary['Enrichment'] = enrichmentStage.counters()
+        logger.info('Summary: ' + json.dumps(summary))
+        
+        failed = [objectSummary for objectSummary in summaries if 'Error' in objectSummary]
+        if isSqsEvent(event):
+            # Only the messages of failed objects are delivered again
+            for s3Object, objectSummary in zip(s3Objects, summaries):
+                if 'Error' in objectSummary:
+                    failedMessages.append(s3Object[0])
+            summary['batchItemFailures'] = [
+                {'itemIdentifier': messageId} for messageId in OrderedDict.fromkeys(failedMessages)
+            ]
             
-            if processRecord(bucketName, mok, record):
-                logger.info('Processing record:' + mok)
-                
-                record['Source'] = {'Bucket':bucketName, 'Key':objectKey}
-                    
-                flattenData = flatten(record, '_') 
-                
-                modifiedData = modifyFlattenData(flattenData)
+        elif len(failed) > 0:
+            raise Exception('; '.join(objectSummary['Error'] for objectSummary in failed))
+            
+        return summary
+
+    except Exception as e:
+        logger.exception(e)
+        raise Exception(e)
+
+    finally:
+        logger.info('Finished')
+        
+#Fused mode, this is the Firehose transformation Lambda instead of FirehoseAddNewLine
+#Firehose writes the modified CTRs, one per line, so no object is read back or written per record
+def firehose_handler(event, context):
+    try:
+        logger.info('Start {}, Version {}'.format(context.function_name, context.function_version))
+        logger.info('Records: {}'.format(len(event['records'])))
+        
+        ctrs = OrderedDict()
+        for record in event['records']:
+            try:
+                ctrs[record['recordId']] = json.loads(base64.b64decode(record['data']).decode('utf-8'))
+            except ValueError as e:
+                logger.error('{} {}'.format(record['recordId'], e))
                 
-                obj = s3Resource.Object(bucketName, mok)
-                obj.put(Body=(bytes(json.dumps(modifiedData).encode('UTF-8'))))
+        # Versions of a contact in different batches are all kept as rows, as with parquet output. The latest view
+        # created by scripts/athena/deploy.sh returns only the newest one
+        dropped = supersededRecords(ctrs) if dedupe else set()
+        
+        enrichmentStage.resetCounters()
+        enrichmentStage.prepare([ctr for recordId, ctr in ctrs.items() if recordId not in dropped])
+        
+        output = []
+        for record in event['records']:
+            recordId = record['recordId']
+            if recordId not in ctrs:
+                output.append(firehoseRecord(recordId, 'ProcessingFailed', record['data']))
+            elif recordId in dropped:
+                output.append(firehoseRecord(recordId, 'Dropped', record['data']))
             else:
-                logger.info('Not processing record:' + mok)
-
+                try:
+                    modifiedData = transformCtr(ctrBucket, None, ctrs[recordId])
+                    data = base64.b64encode((json.dumps(modifiedData) + '\n').encode('utf-8')).decode('ascii')
+                    outputRecord = firehoseRecord(recordId, 'Ok', data)
+                    if dynamicPartitioning:
+                        outputRecord['metadata'] = {'partitionKeys': partitionKeys(ctrs[recordId])}
+                    output.append(outputRecord)
+                except Exception as e:
+                    logger.exception(e)
+                    output.append(firehoseRecord(recordId, 'ProcessingFailed', record['data']))
+                    
+        summary = {'Ok': 0, 'Dropped': 0, 'ProcessingFailed': 0}
+        for outputRecord in output:
+            summary[outputRecord['result']] += 1
+        summary['Enrichment'] = enrichmentStage.counters()
+        logger.info('Summary: ' + json.dumps(summary))
+        
+        return {'records': output}
+        
     except Exception as e:
         logger.exception(e)
         raise Exception(e)
@@ -53,6 +199,260 @@ def lambda_handler(event, context):
     finally:
         logger.info('Finished')
         
+def firehoseRecord(recordId, result, data):
+    # Firehose ignores the data of dropped records and writes the original data of failed ones to the error output
+    return {'recordId': recordId, 'result': result, 'data': data}
+    
+def partitionKeys(ctr):
+    # Same keys as FirehoseAddNewLine, a transformed CTR always has a valid InitiationTimestamp
+    date = ctr_timestamps.parseDate(ctr['InitiationTimestamp'][:10])
+    keys = {'year': '{:04d}'.format(date.year), 'month': '{:02d}'.format(date.month), 'day': '{:02d}'.format(date.day)}
+    
+    channel = ctr.get('Channel')
+    if isinstance(channel, str) and len(channel) > 0:
+        keys['channel'] = channel
+    return keys
+    
+def supersededRecords(ctrs):
+    # Returns the recordIds of the CTRs that a newer version of the same contact in the batch replaces. Same rule as 
+    # dedupeRecords, an equal timestamp does not replace the first version
+    newest = {}
+    dropped = set()
+    for recordId, ctr in ctrs.items():
+        try:
+            contactId = ctr['ContactId']
+            lastUpdateTimestamp = ctr_timestamps.parseCtrTimestamp(ctr['LastUpdateTimestamp'])
+            current = newest.get(contactId)
+        except (KeyError, TypeError, ValueError):
+            continue
+            
+        if current is None:
+            newest[contactId] = (lastUpdateTimestamp, recordId)
+        elif lastUpdateTimestamp > current[0]:
+            dropped.add(current[1])
+            newest[contactId] = (lastUpdateTimestamp, recordId)
+        else:
+            dropped.add(recordId)
+            
+    return dropped
+    
+def processObject(executor, s3Object, ctrModifiedFolder):
+    # Returns the summary of one Firehose object, an error only fails this object and not the others of the event
+    messageId, bucketName, objectKey, objectSize = s3Object
+    summary = {'Bucket': bucketName, 'Key': objectKey}
+    try:
+        if objectSize == 0:
+            raise Exception('Empty object')
+            
+        records = parseObject (bucketName, objectKey)
+        
+        # Connect emits updated CTRs, only the newest version of each contact needs to be written.
+        # Without dedupe the records are processed as they are read from the object
+        duplicates = 0
+        if dedupe:
+            records, duplicates = dedupeRecords(records, ctrModifiedFolder, objectKey)
+            
+        records = enrichBatches(records, batchSize)
+        
+        if outputFormat == 'parquet':
+            results = processParquet(bucketName, objectKey, ctrModifiedFolder, records)
+        elif processingMode == 'serial':
+            results = processSerial(bucketName, objectKey, ctrModifiedFolder, records)
+        else:
+            results = processBatch(executor, bucketName, objectKey, ctrModifiedFolder, records)
+            
+        summary.update(summarizeResults(results))
+        summary['Duplicates'] = duplicates
+        
+        failed = [result for result in results if result['Status'] == 'Failed']
+        if len(failed) > 0:
+            logger.error('Failed records of {}: {}'.format(objectKey, json.dumps(failed)))
+            summary['Error'] = '{} of {} records failed'.format(len(failed), len(results))
+            
+    except Exception as e:
+        logger.exception(e)
+        summary['Error'] = str(e)
+        
+    return summary
+    
+def summarizeObjects(summaries):
+    # Totals of the records of all objects, and the counts of each object. Records are only counted so the response
+    # stays within the Lambda payload limit, processObject logs the failed ones
+    summary = {'Written': 0, 'Skipped': 0, 'Failed': 0, 'Duplicates': 0, 'Objects': []}
+    for objectSummary in summaries:
+        for key in ['Written', 'Skipped', 'Failed', 'Duplicates']:
+            summary[key] += objectSummary.get(key, 0)
+        summary['Objects'].append(objectSummary)
+        
+    return summary
+    
+def processSerial(bucketName, objectKey, ctrModifiedFolder, records):
+    results = []
+    for record in records:
+        results.append(processCtr(bucketName, objectKey, ctrModifiedFolder, record))
+        
+    return results
+    
+def processBatch(executor, bucketName, objectKey, ctrModifiedFolder, records):
+    # Records are submitted in groups of batchSize so only one group per object is in flight at a time. The workers 
+    # are shared by the objects of the event
+    results = []
+    for batch in batchRecords(records, batchSize):
+        results.extend(executor.map(
+            lambda record: processCtr(bucketName, objectKey, ctrModifiedFolder, record), 
+            batch
+        ))
+        
+    return results
+    
+def batchRecords(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+            
+    if len(batch) > 0:
+        yield batch
+        
+def enrichBatches(records, size):
+    # The attributes of each group of records are resolved together before the records are processed, so a remote 
+    # lookup is made once per Firehose object (once per size records while a large object is streamed)
+    for batch in batchRecords(records, size):
+        enrichmentStage.prepare(batch)
+        for record in batch:
+            yield record
+            
+def processParquet(bucketName, objectKey, ctrModifiedFolder, records):
+    # All records of the object are written to a single parquet file. Redelivery of the object overwrites the same 
+    # file, but versions of a contact in different objects are all kept, the latest view of scripts/athena/deploy.sh
+    # returns the newest one. pyarrow comes with numpy, the duration columns are computed for all rows at once
+    if not ctr_parquet.isAvailable():
+        raise Exception('OutputFormat parquet requires pyarrow')
+        
+    pok = parquetObjectKey(ctrModifiedFolder, objectKey)
+    
+    results = []
+    rows = []
+    for record in records:
+        result = {'ContactId': record.get('ContactId'), 'Key': pok, 'Status': None}
+        try:
+            rows.append(ctrColumnTransform.transform(flattenCtr(bucketName, objectKey, record)))
+            result['Status'] = 'Written'
+        except Exception as e:
+            logger.exception(e)
+            result['Status'] = 'Failed'
+            result['Error'] = str(e)
+            
+        results.append(result)
+        
+    columns = None
+    if len(rows) > 0:
+        written = [result for result in results if result['Status'] == 'Written']
+        columns, errors = ctr_columns.durationColumns(rows, projectTimeEnrichment.lookup)
+        for index, error in errors.items():
+            logger.error('{} {}'.format(written[index]['ContactId'], error))
+            written[index]['Status'] = 'Failed'
+            written[index]['Error'] = error
+        if len(errors) > 0:
+            rows, columns = ctr_columns.dropRows(rows, columns, errors)
+        
+    if len(rows) > 0:
+        body = ctr_parquet.toParquet(rows, parquetCompression, columns)
+        s3Client.put_object(Bucket=bucketName, Key=pok, Body=body)
+        logger.info('Wrote {} records to {}'.format(len(rows), pok))
+        
+    return results
+    
+def parquetObjectKey(ctrModifiedFolder, objectKey):
+    key = objectKey.split('/')
+    key[0] = ctrModifiedFolder
+    # The parquet file has its own compression, the extension of a compressed Firehose object is not kept
+    if key[-1].endswith(GZIP_EXTENSION):
+        key[-1] = key[-1][:-len(GZIP_EXTENSION)]
+    key[-1] = key[-1] + '.parquet'
+    key = '/'.join(key)
+    return key
+    
+def transformCtr(bucketName, objectKey, record):
+    return modifyFlattenData(flattenCtr(bucketName, objectKey, record))
+    
+def flattenCtr(bucketName, objectKey, record):
+    if (record['AWSContactTraceRecordFormatVersion'] != '2017-03-10'):
+        raise Exception('Invalid CTR version')
+        
+    record['Source'] = {'Bucket':bucketName, 'Key':objectKey}
+        
+    return flatten(record, '_') 
+    
+def processCtr(bucketName, objectKey, ctrModifiedFolder, record):
+    result = {'ContactId': record.get('ContactId'), 'Key': None, 'Status': None}
+    try:
+        if (record['AWSContactTraceRecordFormatVersion'] != '2017-03-10'):
+            raise Exception('Invalid CTR version')
+            
+        mok = modifiedObjectKey(record, ctrModifiedFolder, objectKey)
+        result['Key'] = mok
+        
+        with modifiedKeyLocks.lockFor(mok):
+            if processRecord(bucketName, mok, record):
+                logger.info('Processing record:' + mok)
+                
+                modifiedData = transformCtr(bucketName, objectKey, record)
+                
+                # The timestamp is kept as metadata so the next version can be checked with a HEAD request
+                s3Client.put_object(
+                    Bucket=bucketName, 
+                    Key=mok, 
+                    Body=json.dumps(modifiedData).encode('UTF-8'),
+                    Metadata={LAST_UPDATE_METADATA_KEY: modifiedData['LastUpdateTimestamp']}
+                )
+                lastUpdateIndex.put(mok, ctr_timestamps.parseModifiedTimestamp(modifiedData['LastUpdateTimestamp']))
+                result['Status'] = 'Written'
+            else:
+                logger.info('Not processing record:' + mok)
+                result['Status'] = 'Skipped'
+            
+    except Exception as e:
+        logger.exception(e)
+        result['Status'] = 'Failed'
+        result['Error'] = str(e)
+        
+    return result
+    
+def dedupeRecords(records, ctrModifiedFolder, objectKey):
+    # Returns the newest version of each contact, in order of first appearance, and the number of versions dropped.
+    # Records without a usable key or timestamp are kept so processCtr reports them. Every record of the object is held
+    # in memory, the template sizes ModifyCtr for the 64 MB objects Firehose writes with dynamic partitioning
+    newest = {}
+    duplicates = 0
+    for index, record in enumerate(records):
+        try:
+            mok = modifiedObjectKey(record, ctrModifiedFolder, objectKey)
+            lastUpdateTimestamp = ctr_timestamps.parseCtrTimestamp(record['LastUpdateTimestamp'])
+        except (KeyError, TypeError, ValueError):
+            newest[index] = (None, record)
+            continue
+        
+        current = newest.get(mok)
+        if current is None:
+            newest[mok] = (lastUpdateTimestamp, record)
+        else:
+            duplicates += 1
+            # Same rule as processRecord, an equal timestamp does not replace what is already there
+            if lastUpdateTimestamp > current[0]:
+                newest[mok] = (lastUpdateTimestamp, record)
+                
+    return [record for lastUpdateTimestamp, record in newest.values()], duplicates
+    
+def summarizeResults(results):
+    summary = {'Written': 0, 'Skipped': 0, 'Failed': 0}
+    for result in results:
+        summary[result['Status']] += 1
+        
+    return summary
+        
 def modifiedObjectKey(record, ctrModifiedFolder, objectKey):
     uniqueIdValue = record['ContactId']
     key = objectKey.split('/')
@@ -62,79 +462,152 @@ def modifiedObjectKey(record, ctrModifiedFolder, objectKey):
     return key
     
 def processRecord(bucketName, modifiedObjectKey, ctr):
-    obj = s3Resource.Object(bucketName, modifiedObjectKey)
+    ctrLastUpdateTimestamp = ctr_timestamps.parseCtrTimestamp(ctr['LastUpdateTimestamp'])
+    
+    cachedLastUpdateTimestamp = lastUpdateIndex.get(modifiedObjectKey)
+    if cachedLastUpdateTimestamp is not None and ctrLastUpdateTimestamp <= cachedLastUpdateTimestamp:
+        return False
+        
+    modifiedLastUpdateTimestamp = modifiedLastUpdate(bucketName, modifiedObjectKey)
+    if modifiedLastUpdateTimestamp is None:
+        return True
+        
+    lastUpdateIndex.put(modifiedObjectKey, modifiedLastUpdateTimestamp)
+    
+    if (ctrLastUpdateTimestamp > modifiedLastUpdateTimestamp):
+        return True
+    else:
+        return False
+        
+def modifiedLastUpdate(bucketName, modifiedObjectKey):
+    # Returns None when the modified object does not exist yet
     try:
-        body = obj.get()['Body'].read()
+        metadata = s3Client.head_object(Bucket=bucketName, Key=modifiedObjectKey)['Metadata']
+        if LAST_UPDATE_METADATA_KEY in metadata:
+            return ctr_timestamps.parseModifiedTimestamp(metadata[LAST_UPDATE_METADATA_KEY])
+        
+        # Objects written before the metadata was added need to be read
+        body = s3Client.get_object(Bucket=bucketName, Key=modifiedObjectKey)['Body'].read()
         bodyString = body.decode('utf-8') 
         bodyJson = json.loads(bodyString)
-        modifiedLastUpdateTimestamp = datetime.datetime.strptime(bodyJson['LastUpdateTimestamp'], '%Y-%m-%d %H:%M:%S') 
+        return ctr_timestamps.parseModifiedTimestamp(bodyJson['LastUpdateTimestamp'])
         
-        ctrLastUpdateTimestamp = datetime.datetime.strptime(ctr['LastUpdateTimestamp'], '%Y-%m-%dT%H:%M:%SZ') 
-        
-        if (ctrLastUpdateTimestamp > modifiedLastUpdateTimestamp):
-            return True
-        else:
-            return False
     except botocore.exceptions.ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            return True
+        # HEAD responses have no body, so a missing key is reported as 404 instead of NoSuchKey
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return None
         else:
             raise Exception(e)
         
-def modifyFlattenData(jsonData):
-    # Athena Timestamp data type does not support Connect timestamps (yyyy-mm-ddThh:mm:ssZ)
-    # https://docs.aws.amazon.com/connect/latest/adminguide/ctr-data-model.html
-    # https://docs.aws.amazon.com/athena/latest/ug/data-types.html
-    # Without this you need to use date_parse(EventTimestamp , '%Y-%m-%dT%H:%i:%s.%fZ') and represent it as a STRING
-    for key in jsonData: 
-        if 'timestamp' in key.lower():
-            value = jsonData[key]
-            
-            if value is not None:
-                modifiedTimestamp = value.replace('T', ' ')
-                modifiedTimestamp = modifiedTimestamp.replace('Z', '')
-                jsonData[key] = modifiedTimestamp
-                
+def isTimestampKey(key):
+    return 'timestamp' in key.lower()
+    
+def resolveCities(cities):
+    geos = geoEnricher.resolve(cities)
+    return {city: geos[ctr_geo.normalizeCity(city)] for city in cities}
+    
+def projectTimeSeconds(value):
+    ptDuration = isodate.parse_duration(value)
+    return int(ptDuration.total_seconds())
+    
+# Resolved once per batch by enrichBatches, the transform reads the results. geoEnricher keeps the cities across warm
+# invocations, so cityEnrichment does not cache them again
+cityEnrichment = ctr_enrichment.Enrichment('udCity', resolveCities, 0)
+projectTimeEnrichment = ctr_enrichment.Enrichment('udProjectTime', ctr_enrichment.resolveEach(projectTimeSeconds))
+enrichmentStage = ctr_enrichment.EnrichmentStage([cityEnrichment, projectTimeEnrichment])
+    
+def enrichCity(jsonData, key, city):
     # Simulate an external api call
-    if 'Attributes_udCity' in jsonData:
-        geo = getGeo(jsonData['Attributes_udCity'])
-        if (geo != None):
-            jsonData['Attributes_udCity_Latitude'] = geo['Latitude']
-            jsonData['Attributes_udCity_Longitude'] = geo['Longitude']
-            jsonData['Attributes_udCity_State'] = geo['State']
-            
+    geo = cityEnrichment.lookup(city)
+    if (geo != None):
+        jsonData['Attributes_udCity_Latitude'] = geo['Latitude']
+        jsonData['Attributes_udCity_Longitude'] = geo['Longitude']
+        jsonData['Attributes_udCity_State'] = geo['State']
+        
+def convertProjectTime(jsonData, key, value):
     # Convert a field
-    if 'Attributes_udProjectTime' in jsonData:
-        ptDuration = isodate.parse_duration(jsonData['Attributes_udProjectTime'])
-        jsonData['Attributes_udProjectTime'] = int(ptDuration.total_seconds())
-                
-    # Add calculated fields
-    dateFormat = '%Y-%m-%d %H:%M:%S'
-    initiationTimestamp = datetime.datetime.strptime(jsonData['InitiationTimestamp'], dateFormat) 
-    disconnectTimestamp = datetime.datetime.strptime(jsonData['DisconnectTimestamp'], dateFormat) 
+    jsonData[key] = projectTimeEnrichment.lookup(value)
+    
+def addContactDuration(jsonData, timestamps):
+    initiationTimestamp = timestamps['InitiationTimestamp']
+    disconnectTimestamp = timestamps['DisconnectTimestamp']
     jsonData['ContactDuration'] = int((disconnectTimestamp - initiationTimestamp).total_seconds())
     
+def addIvrDuration(jsonData, timestamps):
     if 'Queue_EnqueueTimestamp' in jsonData:
-        enqueueTimestamp = datetime.datetime.strptime(jsonData['Queue_EnqueueTimestamp'], dateFormat) 
-        jsonData['IvrDuration'] = int((enqueueTimestamp - initiationTimestamp).total_seconds())
+        enqueueTimestamp = timestamps['Queue_EnqueueTimestamp']
+        jsonData['IvrDuration'] = int((enqueueTimestamp - timestamps['InitiationTimestamp']).total_seconds())
     else:
         jsonData['IvrDuration'] = jsonData['ContactDuration']
         
+def addTalkDuration(jsonData, timestamps):
     if 'Agent_AfterContactWorkDuration' in jsonData:
         if (jsonData['Agent_CustomerHoldDuration'] > 0): 
             jsonData['Agent_TalkDuration'] = jsonData['Agent_AfterContactWorkDuration'] - jsonData['Agent_CustomerHoldDuration']
         else:
             jsonData['Agent_TalkDuration'] = jsonData['Agent_AfterContactWorkDuration']
+            
+# Compiled once per container, steps run in the order they are listed
+ctrTransform = ctr_transform.TransformPipeline(
+    isTimestampKey, 
+    ctr_timestamps.toModifiedTimestamp, 
+    ctr_timestamps.parseModifiedTimestamp,
+    fields=[
+        ('Attributes_udCity', enrichCity),
+        ('Attributes_udProjectTime', convertProjectTime)
+    ],
+    derived=[
+        (['InitiationTimestamp', 'DisconnectTimestamp'], addContactDuration),
+        (['InitiationTimestamp', 'Queue_EnqueueTimestamp'], addIvrDuration),
+        ([], addTalkDuration)
+    ])
     
-    jsonDataSorted = dict(sorted(jsonData.items()))
-    return jsonDataSorted
+# Used for parquet output, ctr_columns.durationColumns computes the durations and udProjectTime for all rows at once
+ctrColumnTransform = ctr_transform.TransformPipeline(
+    isTimestampKey, 
+    ctr_timestamps.toModifiedTimestamp, 
+    ctr_timestamps.parseModifiedTimestamp,
+    fields=[
+        ('Attributes_udCity', enrichCity)
+    ],
+    derived=[
+        ([], addTalkDuration)
+    ])
+    
+def modifyFlattenData(jsonData):
+    # Keys keep the order of the flattened CTR, the JSON SerDe and the parquet schema read columns by name
+    return ctrTransform.transform(jsonData)
         
+def isSqsEvent(event):
+    records = event.get('Records', [])
+    return len(records) > 0 and records[0].get('eventSource') == 'aws:sqs'
+    
 def parseEvent(event):
+    # Returns (messageId, bucketName, objectKey, objectSize) of every object of the event, messageId is None when S3
+    # invoked the function, and the ids of the SQS messages that are not S3 events
     records = event['Records']
-    if len(records) != 1:
+    if len(records) == 0:
         raise Exception('Invalid number of records')
+        
+    if not isSqsEvent(event):
+        return [parseS3Record(None, record) for record in records], []
+        
+    s3Objects = []
+    failedMessages = []
+    for message in records:
+        try:
+            # The test event S3 sends when the notification is configured has no records
+            s3Event = json.loads(message['body'])
+            messageObjects = [parseS3Record(message['messageId'], record) for record in s3Event.get('Records', [])]
+            s3Objects.extend(messageObjects)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.error('Invalid message {}: {}'.format(message['messageId'], e))
+            failedMessages.append(message['messageId'])
+            
+    return s3Objects, failedMessages
     
-    s3 = records[0]['s3']
+def parseS3Record(messageId, record):
+    s3 = record['s3']
     
     bucketName = s3['bucket']['name']
     
@@ -142,86 +615,60 @@ def parseEvent(event):
     objectKey = unquote(objectKey)
     
     objectSize = s3['object']['size']
-    if objectSize == 0:
-        raise Exception('Empty object')
-        
-    return bucketName, objectKey
     
-def parseObject (bucketName, objectKey):
-    obj = s3Resource.Object(bucketName, objectKey)
-    body = obj.get()['Body'].read()
+    return messageId, bucketName, objectKey, objectSize
     
-    bodyString = body.decode('utf-8') 
-    bodyStringParts = bodyString.splitlines()
+def parseObject (bucketName, objectKey):
+    # Yields one CTR per line while the object is read, so memory does not grow with the size of the object. 
+    # Compressed objects are decompressed as they are read
+    response = s3Client.get_object(Bucket=bucketName, Key=objectKey)
+    body = decompressedBody(response, objectKey)
     
-    bodyJson = []
-    for part in bodyStringParts:
-        bodyJson.append(json.loads(part))
+    for line in iterLines(body, STREAM_CHUNK_SIZE):
+        yield json.loads(line.decode('utf-8'))
+        
+def decompressedBody(response, objectKey):
+    body = response['Body']
+    if objectKey.endswith(GZIP_EXTENSION) or 'gzip' in response.get('ContentEncoding', '').lower():
+        return gzip.GzipFile(fileobj=body, mode='rb')
+        
+    body = PeekedStream(body, len(GZIP_MAGIC))
+    if body.head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=body, mode='rb')
+    return body
     
-    return bodyJson
-
-def getGeo(city):
-    # https://www.gps-coordinates.net/
-    # These cities match the cities in MockCtr
-    cities = {
-        'newyorkcity':      {'Latitude': 40.712728, 'Longitude': -74.006015,    'State': 'NY'}, 
-        'losangeles':       {'Latitude': 34.053691, 'Longitude': -118.242766,   'State': 'CA'}, 
-        'chicago':          {'Latitude': 41.875562, 'Longitude': -87.624421,    'State': 'IL'},  
-        'houston':          {'Latitude': 29.758938, 'Longitude': -95.367697,    'State': 'TX'}, 
-        'phoenix':          {'Latitude': 33.448437, 'Longitude': -112.074142,   'State': 'AZ'},  
-        'philadelphia':     {'Latitude': 39.952724, 'Longitude': -75.163526,    'State': 'PA'},  
-        'sanantonio':       {'Latitude': 29.4246,   'Longitude': -98.49514,     'State': 'TX'},  
-        'sandiego':         {'Latitude': 32.71742,  'Longitude': -117.162773,   'State': 'CA'},  
-        'dallas':           {'Latitude': 32.776272, 'Longitude': -96.796856,    'State': 'TX'},  
-        'sanjose':          {'Latitude': 37.336191, 'Longitude': -121.890583,   'State': 'CA'},  
-        'austin':           {'Latitude': 30.271129, 'Longitude': -97.743699,    'State': 'TX'},  
-        'jacksonville':     {'Latitude': 30.332184, 'Longitude': -81.655651,    'State': 'FL'},  
-        'fortworth':        {'Latitude': 32.753177, 'Longitude': -97.332746,    'State': 'TX'},  
-        'columbus':         {'Latitude': 39.96226,  'Longitude': -83.000706,    'State': 'OH'},  
-        'charlotte':        {'Latitude': 35.227209, 'Longitude': -80.843083,    'State': 'NC'},  
-        'sanfrancisco':     {'Latitude': 37.779026, 'Longitude': -122.419906,   'State': 'CA'},  
-        'indianapolis':     {'Latitude': 39.768333, 'Longitude': -86.15835,     'State': 'IN'},  
-        'seattle':          {'Latitude': 47.603832, 'Longitude': -122.330062,   'State': 'WA'},  
-        'denver':           {'Latitude': 39.739236, 'Longitude': -104.984862,   'State': 'CO'},  
-        'washington':       {'Latitude': 38.895037, 'Longitude': -77.036543,    'State': 'WA'},  
-        'boston':           {'Latitude': 42.360253, 'Longitude': -71.058291,    'State': 'CA'},  
-        'elpaso':           {'Latitude': 31.775415, 'Longitude': -106.464634,   'State': 'TX'},  
-        'nashville':        {'Latitude': 36.16223,  'Longitude': -86.774353,    'State': 'TN'}, 
-        'detroit':          {'Latitude': 42.331551, 'Longitude': -83.04664,     'State': 'MI'}, 
-        'oklahomacity':     {'Latitude': 35.472989, 'Longitude': -97.517054,    'State': 'OK'}, 
-        'portland':         {'Latitude': 45.520247, 'Longitude': -122.674195,   'State': 'OR'}, 
-        'lasvegas':         {'Latitude': 36.167256, 'Longitude': -115.148516,   'State': 'NV'}, 
-        'memphis':          {'Latitude': 35.149022, 'Longitude': -90.051628,    'State': 'TN'}, 
-        'louisville':       {'Latitude': 38.254238, 'Longitude': -85.759407,    'State': 'KY'}, 
-        'baltimore':        {'Latitude': 39.290882, 'Longitude': -76.610759,    'State': 'MD'}, 
-        'milwaukee':        {'Latitude': 43.034993, 'Longitude': -87.922497,    'State': 'WI'}, 
-        'albuquerque':      {'Latitude': 35.084103, 'Longitude': -106.650985,   'State': 'NM'}, 
-        'tucson':           {'Latitude': 32.222877, 'Longitude': -110.974848,   'State': 'AZ'}, 
-        'fresno':           {'Latitude': 36.739442, 'Longitude': -119.784831,   'State': 'CA'}, 
-        'mesa':             {'Latitude': 33.415112, 'Longitude': -111.831479,   'State': 'AZ'}, 
-        'sacramento':       {'Latitude': 38.581061, 'Longitude': -121.493895,   'State': 'CA'}, 
-        'atlanta':          {'Latitude': 33.748992, 'Longitude': -84.390264,    'State': 'GA'}, 
-        'kansascity':       {'Latitude': 39.100105, 'Longitude': -94.578142,    'State': 'KS'}, 
-        'coloradosprings':  {'Latitude': 38.833958, 'Longitude': -104.825348,   'State': 'CO'}, 
-        'omaha':            {'Latitude': 41.258746, 'Longitude': -95.938376,    'State': 'NE'}, 
-        'raleigh':          {'Latitude': 35.780398, 'Longitude': -78.639099,    'State': 'NC'}, 
-        'miami':            {'Latitude': 25.774173, 'Longitude': -80.19362,     'State': 'FL'}, 
-        'longbeach':        {'Latitude': 33.769016, 'Longitude': -118.191604,   'State': 'CA'}, 
-        'virginiabeach':    {'Latitude': 36.852984, 'Longitude': -75.977418,    'State': 'VA'}, 
-        'oakland':          {'Latitude': 37.804456, 'Longitude': -122.271356,   'State': 'CA'}, 
-        'minneapolis':      {'Latitude': 44.9773,   'Longitude': -93.265469,    'State': 'MN'}, 
-        'tulsa':            {'Latitude': 36.155681, 'Longitude': -95.992911,    'State': 'OK'}, 
-        'tampa':            {'Latitude': 27.94776,  'Longitude': -82.458444,    'State': 'FL'}, 
-        'arlington':        {'Latitude': 32.701939, 'Longitude': -97.105624,    'State': 'TX'}, 
-        'neworleans':       {'Latitude': 29.949932, 'Longitude': -90.070116,    'State': 'LA'}, 
-    }
-    
-    city = city.lower()
-    city = city.replace(' ', '')
-    city = city.replace('_', '')
-    
-    geo = None
-    if city in cities:
-        geo = cities[city]
-    
-    return geo
\ No newline at end of file
+class PeekedStream:
+    # Stream whose first bytes have already been read to check them, read returns them again before the rest
+    def __init__(self, stream, size):
+        self.stream = stream
+        self.head = stream.read(size)
+        self.pending = self.head
+        
+    def read(self, size=-1):
+        if len(self.pending) == 0:
+            return self.stream.read(size)
+            
+        if size is None or size < 0:
+            data = self.pending + self.stream.read()
+        elif size <= len(self.pending):
+            data = self.pending[:size]
+            self.pending = self.pending[size:]
+            return data
+        else:
+            data = self.pending + self.stream.read(size - len(self.pending))
+        self.pending = b''
+        return data
+        
+def iterLines(stream, chunkSize):
+    # A newline is a single byte in UTF-8 and is never part of a multi byte character, so the bytes can be split 
+    # before they are decoded. Only the current chunk and the unfinished line are buffered
+    pending = b''
+    for chunk in iter(lambda: stream.read(chunkSize), b''):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+                
+    if pending.strip():
+        yield pending
@@ -33,8 +33,21 @@ function AthenaQueryResult () {
 StackName=$Prefix-AthenaS3
 AthenaTableS3Location=s3://$CTRS3Bucket/$CTRModifiedS3Folder/
 
-AthenaQueryString=$(cat <<-END
-    CREATE external TABLE $AthenaTableName (
+# Fused mode always writes json lines, the pipeline template rejects parquet output with it
+if [[ "$PipelineMode" == "fused" && "$OutputFormat" == "parquet" ]]
+then
+    echo "PipelineMode fused writes json, set OutputFormat=json"
+    exit 1
+fi
+
+# ModifyCtr writes one JSON object per CTR, or one parquet file per Firehose object
+AthenaTableFormat="ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'"
+if [[ "$OutputFormat" == "parquet" ]]
+then
+    AthenaTableFormat="STORED AS PARQUET"
+fi
+
+AthenaTableColumns=$(cat <<-END
     	AWSAccountId STRING,
     	AWSContactTraceRecordFormatVersion STRING,
     	Agent_ARN STRING,
@@ -99,9 +112,15 @@ AthenaQueryString=$(cat <<-END
     	IvrDuration INT,
     	Source_Bucket STRING,
     	Source_Key STRING
+END
+)
+
+AthenaQueryString=$(cat <<-END
+    CREATE external TABLE $AthenaTableName (
+$AthenaTableColumns
     )
     PARTITIONED BY (year SMALLINT, month TINYINT, day TINYINT)
-    ROW FORMAT SERDE 'org.openx.data.jsonserde.JsonSerDe'
+    $AthenaTableFormat
     LOCATION '$AthenaTableS3Location'
 END
 )
@@ -153,4 +172,33 @@ CreatePartitionsExecutionId=$(
 
 AthenaQueryResult $CreatePartitionsExecutionId CreatePartitions
 
+# Parquet output and fused mode keep every version of a contact as its own row, the view returns only the newest
+# version. The modified object of a contact is overwritten otherwise, so the table is queried directly and keeps its
+# partition pruning
+if HasContactVersions
+then
+    AthenaViewColumns=$(echo "$AthenaTableColumns" | awk '{print $1}' | paste -sd, -)
+    AthenaViewQueryString=$(cat <<-END
+    CREATE OR REPLACE VIEW $AthenaViewName AS
+    SELECT $AthenaViewColumns, year, month, day FROM (
+        SELECT *, row_number() OVER (PARTITION BY contactid ORDER BY lastupdatetimestamp DESC) AS versionrank
+        FROM $AthenaTableName
+    )
+    WHERE versionrank = 1
+END
+)
+else
+    AthenaViewQueryString="DROP VIEW IF EXISTS $AthenaViewName"
+fi
+
+CreateViewExecutionId=$(
+    aws athena start-query-execution \
+    --query-string "$AthenaViewQueryString" \
+    --query-execution-context "Database=$ConnectDatabase" \
+    --result-configuration "OutputLocation"="s3://$AthenaBucket" \
+    | jq -r ".QueryExecutionId"
+)
+
+AthenaQueryResult $CreateViewExecutionId CreateView
+
 sed -i "s/^AthenaS3Output.*/AthenaS3Output=$AthenaBucket/" ../common/parameters.ini
\ No newline at end of file
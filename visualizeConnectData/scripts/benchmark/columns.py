@@ -0,0 +1,73 @@
+#!/usr/bin/python
+
+# Compares the time to transform and write the parquet rows of an object in the ModifyCtr lambda with the columns
+# computed per record and per object. Requires pyarrow
+# python3 columns.py [numOfCtrs]
+
+import io
+import sys
+import time
+import stubs
+import pyarrow
+import pyarrow.parquet
+import lambda_function
+import ctr_columns
+import ctr_parquet
+import ctr_timestamps
+
+def legacyToParquet(rows, compression='snappy'):
+    # ctr_parquet.toParquet converting every value on its own, as before ctr_columns
+    columns = ctr_parquet.buildSchema(rows)
+
+    data = {}
+    for name, columnType in columns:
+        data[name] = [ctr_parquet.convertValue(row.get(name), columnType) for row in rows]
+
+    schema = pyarrow.schema([(name, ctr_parquet.arrowType(columnType)) for name, columnType in columns])
+    table = pyarrow.Table.from_pydict(data, schema=schema)
+
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(table, buffer, compression=compression, use_deprecated_int96_timestamps=True)
+    return buffer.getvalue()
+
+def perRecord(rows):
+    rows = [lambda_function.ctrTransform.transform(row) for row in rows]
+    return legacyToParquet(rows)
+
+def perObject(rows):
+    rows = [lambda_function.ctrColumnTransform.transform(row) for row in rows]
+    columns, errors = ctr_columns.durationColumns(rows, lambda_function.projectTimeEnrichment.lookup)
+    if len(errors) > 0:
+        rows, columns = ctr_columns.dropRows(rows, columns, errors)
+    return ctr_parquet.toParquet(rows, 'snappy', columns)
+
+def measure(name, function, flattened, baseline=None):
+    # Best of 5 runs, the rows are copied before each run because the transform changes them in place. The timestamps
+    # of a new object are not cached yet
+    elapsed = None
+    for run in range(5):
+        rows = [dict(row) for row in flattened]
+        ctr_timestamps.parseModifiedTimestamp.cache_clear()
+        start = time.perf_counter()
+        function(rows)
+        runElapsed = time.perf_counter() - start
+        elapsed = runElapsed if elapsed is None else min(elapsed, runElapsed)
+
+    perRow = elapsed / len(flattened) * 1000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / perRow)
+    print('{:32} {:8.2f} us/row {}'.format(name, perRow, speedup))
+    return perRow
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    ctrs = stubs.mockCtrs(numOfCtrs)
+    lambda_function.enrichmentStage.prepare(ctrs)
+    flattened = [lambda_function.flattenCtr(stubs.BUCKET_NAME, 'ctr/benchmark', ctr) for ctr in ctrs]
+    print('{} rows'.format(numOfCtrs))
+
+    baseline = measure('transform and parquet, per record', perRecord, flattened)
+    measure('transform and parquet, per object', perObject, flattened, baseline)
+
+if __name__ == '__main__':
+    main()
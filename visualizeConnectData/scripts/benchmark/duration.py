@@ -0,0 +1,46 @@
+#!/usr/bin/python
+
+# Compares the time per call of the isodate.parse_duration fast path and the full parser for the
+# Attributes_udProjectTime values of the mock CTRs
+# python3 duration.py [numOfCtrs]
+
+import sys
+import time
+import stubs
+import isodate
+from isodate import isoduration
+
+def fullParse(value):
+    # parse_duration with the fast path turned off
+    simple = isoduration._parse_simple_duration
+    isoduration._parse_simple_duration = lambda datestring: None
+    try:
+        return isodate.parse_duration(value)
+    finally:
+        isoduration._parse_simple_duration = simple
+
+def measure(name, function, values, baseline=None):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    elapsed = time.perf_counter() - start
+
+    perCall = elapsed / len(values) * 1000000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / perCall)
+    print('{:30} {:8.0f} ns/call {}'.format(name, perCall, speedup))
+    return perCall
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    ctrs = stubs.mockCtrs(numOfCtrs)
+    values = [ctr['Attributes']['udProjectTime'] for ctr in ctrs if 'udProjectTime' in (ctr.get('Attributes') or {})]
+    print('{} udProjectTime values, {} distinct'.format(len(values), len(set(values))))
+
+    baseline = measure('full parser', fullParse, values)
+    measure('fast path, no cache', isoduration._parse_simple_duration.__wrapped__, values, baseline)
+    isoduration._parse_simple_duration.cache_clear()
+    measure('parse_duration', isodate.parse_duration, values, baseline)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+
+# Measures the memory held by isodate.Duration instances and the time per call of the arithmetic the CTR processing
+# uses. Pass the folder holding another isodate package (e.g. an older checkout of lambdas/modifyCTR) to measure it
+# instead of the current one
+# python3 durationClass.py [numOfDurations] [isodateFolder]
+
+import sys
+if len(sys.argv) > 2:
+    sys.path.insert(0, sys.argv[2])
+
+import time
+import pickle
+import datetime
+import tracemalloc
+import stubs
+import isodate
+from isodate import Duration
+
+def bytesPerInstance(count):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    durations = [Duration(days=x % 30, hours=x % 24, months=x % 12, years=x % 3) for x in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return (allocated - sys.getsizeof(durations)) / count
+
+def measure(name, function, values):
+    # Best of 5 runs, the other runs include noise from the machine
+    elapsed = None
+    for run in range(5):
+        start = time.perf_counter()
+        try:
+            for value in values:
+                function(value)
+        except TypeError as e:
+            # Durations holding Decimal years and months cannot be added to dates on recent Python versions
+            print('{:32} fails, {}'.format(name, e))
+            return
+        runElapsed = time.perf_counter() - start
+        elapsed = runElapsed if elapsed is None else min(elapsed, runElapsed)
+
+    print('{:32} {:8.0f} ns/call'.format(name, elapsed / len(values) * 1000000000))
+
+def main():
+    numOfDurations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print('isodate from {}'.format(isodate.__file__))
+
+    print('{:32} {:8.0f} bytes'.format('Duration instance', bytesPerInstance(numOfDurations)))
+
+    durations = [Duration(days=x % 30, hours=x % 24, months=x % 12, years=x % 3) for x in range(numOfDurations)]
+    seconds = [Duration(seconds=x % 3600) for x in range(numOfDurations)]
+    start = datetime.datetime(2021, 4, 1, 10, 15)
+    other = Duration(days=1, months=1)
+
+    measure('Duration()', lambda x: Duration(seconds=x), range(numOfDurations))
+    measure('Duration + Duration', lambda duration: duration + other, durations)
+    measure('Duration - Duration', lambda duration: duration - other, durations)
+    measure('Duration * 2', lambda duration: duration * 2, durations)
+    measure('datetime + Duration', lambda duration: start + duration, durations)
+    measure('datetime - Duration', lambda duration: start - duration, durations)
+    measure('totimedelta, seconds only', lambda duration: duration.totimedelta(start), seconds)
+    measure('Duration == Duration', lambda duration: duration == other, durations)
+    measure('pickle round trip', lambda duration: pickle.loads(pickle.dumps(duration)), durations[:1000])
+
+    total = time.perf_counter()
+    sum(durations[:1000], Duration())
+    print('{:32} {:8.0f} ns/term'.format('sum of 1000 Durations', (time.perf_counter() - total) / 1000 * 1000000000))
+
+if __name__ == '__main__':
+    main()
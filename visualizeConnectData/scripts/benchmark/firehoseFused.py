@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+# Compares the separate pipeline (FirehoseAddNewLine, Firehose writes the object, ModifyCtr reads it back and writes
+# one object per CTR) with fused mode (ModifyCtr is the Firehose transformation) for one transformation batch, against
+# a stubbed S3
+# python3 firehoseFused.py [numOfCtrs] [latencyMs]
+
+import sys
+import json
+import base64
+import stubs
+import lambda_function
+
+firehoseAddNewLine = stubs.loadLambda('firehoseAddNewLine')
+
+def separate(event, s3, objectKey):
+    # Firehose concatenates the transformed records into one object, the S3 event then invokes ModifyCtr
+    response = firehoseAddNewLine.lambda_handler(event, stubs.StubContext())
+    body = b''.join(base64.b64decode(record['data']) for record in response['records'])
+    s3.put_object(Bucket=stubs.BUCKET_NAME, Key=objectKey, Body=body)
+
+    lambda_function.s3Client = s3
+    lambda_function.lastUpdateIndex = lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)
+    return lambda_function.lambda_handler(stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)), stubs.StubContext())
+
+def fused(event, s3, objectKey):
+    # Firehose writes the transformed records to the modified folder itself
+    response = lambda_function.firehose_handler(event, stubs.StubContext())
+    body = b''.join(base64.b64decode(record['data']) for record in response['records'] if record['result'] == 'Ok')
+    s3.put_object(Bucket=stubs.BUCKET_NAME, Key=objectKey, Body=body)
+    return response
+
+def run(name, ctrs, latencyMs):
+    event = stubs.firehoseEvent([json.dumps(ctr).encode('utf-8') for ctr in ctrs])
+
+    s3 = stubs.StubS3Client(latencyMs)
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-1'
+    elapsed, summary = stubs.timeIt(separate, event, s3, objectKey)
+    print('{:32} {:8.3f} s  {:2} invocations  requests {}'.format(name + ', separate', elapsed, 2, s3.requests))
+
+    s3 = stubs.StubS3Client(latencyMs)
+    objectKey = 'ctrmodified/year=2021/month=04/day=01/benchmark-1'
+    elapsed, response = stubs.timeIt(fused, event, s3, objectKey)
+    results = [record['result'] for record in response['records']]
+    print('{:32} {:8.3f} s  {:2} invocations  requests {}  {}'.format(
+        name + ', fused', elapsed, 1, s3.requests, {result: results.count(result) for result in set(results)}))
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latencyMs = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    lambda_function.ctrBucket = stubs.BUCKET_NAME
+
+    print('{} CTRs, {} ms per S3 request'.format(numOfCtrs, latencyMs))
+    run('1 version per contact', stubs.mockCtrs(numOfCtrs), latencyMs)
+    run('3 versions per contact', stubs.mockVersions(stubs.mockCtrs(numOfCtrs // 3), 3), latencyMs)
+
+if __name__ == '__main__':
+    main()
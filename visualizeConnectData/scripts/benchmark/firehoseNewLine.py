@@ -0,0 +1,94 @@
+#!/usr/bin/python
+
+# Compares the FirehoseAddNewLine lambda with the version that decoded and encoded every record, for transformation
+# batches shaped like the ones Firehose sends (500 records, 6 MB of base64 data): time per batch and peak memory.
+# Logs are written at INFO level to a handler like in Lambda, so messages are formatted. Also measures the cost of
+# returning the partition keys for dynamic partitioning
+# python3 firehoseNewLine.py [numOfRecords] [batchMegabytes]
+
+import os
+os.environ['LOG_LEVEL'] = 'INFO'
+
+import sys
+import json
+import time
+import base64
+import logging
+import tracemalloc
+import stubs
+
+firehoseAddNewLine = stubs.loadLambda('firehoseAddNewLine')
+logger = firehoseAddNewLine.logger
+
+def legacyHandler(event, context):
+    # lambda_handler before the base64 data was framed directly
+    logger.info('Start {}, Version {}'.format(context.function_name, context.function_version))
+    logger.info('Event: ' + json.dumps(event))
+
+    output = []
+    for record in event['records']:
+        payload = base64.b64decode(record['data'])
+        payload = payload + '\n'.encode('ascii')
+
+        outputRecord = {
+            'recordId': record['recordId'],
+            'result': 'Ok',
+            'data': base64.b64encode(payload)
+        }
+        output.append(outputRecord)
+
+    returnValue = {'records': output}
+    logger.info(returnValue)
+    logger.info('Finished')
+    return returnValue
+
+def firehoseEvent(numOfRecords, batchBytes):
+    # CTRs padded to the record size, with a length varying by one byte so the three base64 paddings are covered
+    ctrs = stubs.mockCtrs(numOfRecords)
+    recordSize = batchBytes * 3 // 4 // numOfRecords
+    payloads = []
+    for index, ctr in enumerate(ctrs):
+        payload = json.dumps(ctr).encode('utf-8')
+        payloads.append(payload + b' ' * max(0, recordSize - len(payload) - index % 3))
+
+    return stubs.firehoseEvent(payloads)
+
+def measure(name, handler, event, baseline=None):
+    # Best of 5 runs for the time, the peak memory is measured in a separate run
+    elapsed = None
+    for run in range(5):
+        start = time.perf_counter()
+        handler(event, stubs.StubContext())
+        runElapsed = time.perf_counter() - start
+        elapsed = runElapsed if elapsed is None else min(elapsed, runElapsed)
+
+    tracemalloc.start()
+    handler(event, stubs.StubContext())
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    megabytes = sum(len(record['data']) for record in event['records']) / 1000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / elapsed)
+    print('{:10} {:8.1f} ms {:8.1f} MB/s {:8.1f} MB peak {}'.format(
+        name, elapsed * 1000, megabytes / elapsed, peak / 1000000, speedup))
+    return elapsed
+
+def main():
+    numOfRecords = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    batchMegabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    # Lambda formats every message it writes to CloudWatch
+    logging.getLogger().addHandler(logging.StreamHandler(open(os.devnull, 'w')))
+
+    event = firehoseEvent(numOfRecords, int(batchMegabytes * 1000000))
+    print('{} records, {:.1f} MB of base64 data'.format(
+        numOfRecords, sum(len(record['data']) for record in event['records']) / 1000000))
+
+    baseline = measure('legacy', legacyHandler, event)
+    measure('framed', firehoseAddNewLine.lambda_handler, event, baseline)
+
+    firehoseAddNewLine.dynamicPartitioning = True
+    measure('partitioned', firehoseAddNewLine.lambda_handler, event, baseline)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+
+# Per record flatten time over mock CTRs, against the recursive flatten from flatten_json 0.1.7
+# python3 flatten.py [numOfCtrs]
+
+import sys
+import time
+import stubs
+import flatten_json
+
+def recursiveFlatten(nested_dict, separator='_', root_keys_to_ignore=set()):
+    # flatten from flatten_json 0.1.7
+    flattened_dict = dict()
+
+    def _flatten(object_, key):
+        if not object_:
+            flattened_dict[key] = object_
+        elif isinstance(object_, dict):
+            for object_key in object_:
+                if not (not key and object_key in root_keys_to_ignore):
+                    _flatten(object_[object_key], flatten_json._construct_key(key, separator, object_key))
+        elif isinstance(object_, (list, set, tuple)):
+            for index, item in enumerate(object_):
+                _flatten(item, flatten_json._construct_key(key, separator, index))
+        else:
+            flattened_dict[key] = object_
+
+    _flatten(nested_dict, None)
+    return flattened_dict
+
+def measure(name, function, ctrs, baseline=None):
+    start = time.perf_counter()
+    for ctr in ctrs:
+        function(ctr)
+    elapsed = time.perf_counter() - start
+
+    perRecord = elapsed / len(ctrs) * 1000000
+    speedup = '' if baseline is None else '{:6.2f}x'.format(baseline / perRecord)
+    print('{:24} {:8.2f} us/record {}'.format(name, perRecord, speedup))
+    return perRecord
+
+def sharedKeys(function, ctrs):
+    # Share of the keys of a record that are the same string objects as the keys of the record before
+    shared = 0
+    total = 0
+    previous = {}
+    for ctr in ctrs:
+        keys = list(function(ctr))
+        for key in keys:
+            if key in previous and previous[key] is key:
+                shared += 1
+        total += len(keys)
+        previous = {key: key for key in keys}
+
+    return shared / total
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ctrs = stubs.mockCtrs(numOfCtrs)
+
+    implementations = [
+        ('flatten 0.1.7', lambda ctr: recursiveFlatten(ctr, '_')),
+        ('flatten', lambda ctr: flatten_json.flatten(ctr, '_'))
+    ]
+
+    print('{} CTRs'.format(numOfCtrs))
+    baseline = None
+    for name, function in implementations:
+        perRecord = measure(name, function, ctrs, baseline)
+        baseline = baseline or perRecord
+
+    for name, function in implementations:
+        print('{:24} {:8.1%} of keys shared with the previous record'.format(name, sharedKeys(function, ctrs[:1000])))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+# Throughput of the streaming flatten_json command line over a newline delimited file of mock CTRs, for several
+# worker counts
+# python3 flattenCli.py [numOfCtrs]
+
+import os
+import sys
+import tempfile
+import subprocess
+import stubs
+
+FLATTEN_JSON = os.path.join('..', '..', 'lambdas', 'modifyCTR', 'flatten_json.py')
+
+def run(inputPath, outputPath, *args):
+    with open(inputPath) as inputFile, open(outputPath, 'w') as outputFile:
+        completed = subprocess.run([sys.executable, FLATTEN_JSON, '--ndjson', '--report'] + list(args),
+                                   stdin=inputFile, stdout=outputFile, stderr=subprocess.PIPE, check=True)
+    return completed.stderr.decode('utf-8').strip()
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    ctrs = stubs.mockCtrs(numOfCtrs)
+
+    with tempfile.TemporaryDirectory() as folder:
+        inputPath = os.path.join(folder, 'ctrs.json')
+        outputPath = os.path.join(folder, 'flattened.json')
+        with open(inputPath, 'wb') as inputFile:
+            inputFile.write(stubs.mockObject(ctrs))
+
+        print('{} CTRs, {} CPUs'.format(numOfCtrs, os.cpu_count()))
+        for workers in [1, 2, 4]:
+            for ordered in [True, False]:
+                if workers == 1 and not ordered:
+                    continue
+
+                args = ['--workers', str(workers), '--root-keys-to-ignore', 'Recordings']
+                if not ordered:
+                    args.append('--unordered')
+
+                report = run(inputPath, outputPath, *args)
+                print('{} workers {:9}  {}'.format(workers, 'ordered' if ordered else 'unordered', report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+# Compares lookups per record through the cache of ctr_geo against the dict getGeo used to build on every call, and
+# counts the requests a remote backend gets per Firehose object with a local HTTP server standing in for it
+# python3 geo.py [numOfCtrs]
+
+import sys
+import json
+import time
+import threading
+import http.server
+import stubs
+import ctr_geo
+import lambda_function
+
+class StubGeoHandler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+    index = ctr_geo.loadIndex(ctr_geo.CITIES_FILE)
+
+    def do_POST(self):
+        StubGeoHandler.requests += 1
+        cities = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['Cities']
+        body = json.dumps({city: self.index[city] for city in cities if city in self.index}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+CITIES = ctr_geo.loadIndex(ctr_geo.CITIES_FILE)
+
+def legacyGetGeo(city):
+    # getGeo before the index built a dict literal of the same cities on every call
+    cities = {name: dict(geo) for name, geo in CITIES.items()}
+
+    city = city.lower()
+    city = city.replace(' ', '')
+    city = city.replace('_', '')
+
+    geo = None
+    if city in cities:
+        geo = cities[city]
+
+    return geo
+
+def measure(name, function, cities, baseline=None):
+    start = time.perf_counter()
+    for city in cities:
+        function(city)
+    elapsed = time.perf_counter() - start
+
+    perCall = elapsed / len(cities) * 1000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / perCall)
+    print('{:24} {:8.2f} us/call {}'.format(name, perCall, speedup))
+    return perCall
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    ctrs = stubs.mockCtrs(numOfCtrs)
+    cities = [ctr['Attributes']['udCity'] for ctr in ctrs if 'udCity' in (ctr.get('Attributes') or {})]
+    cities += ['New York City', 'new_york_city', 'Springfield', '']
+
+    print('{} lookups, {} distinct cities'.format(len(cities), len(set(cities))))
+
+    baseline = measure('dict per call', legacyGetGeo, cities)
+    measure('GeoEnricher.get', ctr_geo.createEnricher('local').get, cities, baseline)
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), StubGeoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = 'http://127.0.0.1:{}/geo'.format(server.server_port)
+
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-1'
+    body = stubs.mockObject(ctrs)
+    lambda_function.geoEnricher = ctr_geo.createEnricher('remote', endpoint)
+    for run in ['cold', 'warm']:
+        s3 = stubs.StubS3Client(0)
+        s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+        lambda_function.s3Client = s3
+        lambda_function.lastUpdateIndex = lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)
+
+        StubGeoHandler.requests = 0
+        elapsed, summary = stubs.timeIt(lambda_function.lambda_handler, stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)), stubs.StubContext())
+        print('remote {:5} {} records written in {:.2f} s with {} geo requests'.format(run, summary['Written'], elapsed, StubGeoHandler.requests))
+        print('             enrichment {}'.format(summary['Enrichment']))
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
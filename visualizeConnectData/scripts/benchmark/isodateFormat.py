@@ -0,0 +1,53 @@
+#!/usr/bin/python
+
+# Compares isodate.strftime with the compiled format plans against compiling the format on every call, which scans
+# the format like the previous re.sub implementation did
+# python3 isodateFormat.py [numOfCalls]
+
+import sys
+import time
+import datetime
+import stubs
+import isodate
+from isodate import isostrf
+
+def uncached(function):
+    def format(value):
+        isostrf.STRF_DT_PLAN_CACHE.clear()
+        isostrf.STRF_D_PLAN_CACHE.clear()
+        return function(value)
+    return format
+
+def measure(name, function, values, baseline=None):
+    # Best of 5 runs, the other runs include noise from the machine
+    elapsed = None
+    for run in range(5):
+        start = time.perf_counter()
+        for value in values:
+            function(value)
+        runElapsed = time.perf_counter() - start
+        elapsed = runElapsed if elapsed is None else min(elapsed, runElapsed)
+
+    perCall = elapsed / len(values) * 1000000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / perCall)
+    print('{:40} {:8.0f} ns/call {}'.format(name, perCall, speedup))
+    return perCall
+
+def main():
+    numOfCalls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    start = datetime.datetime(2021, 4, 1, 10, 15, tzinfo=isodate.UTC)
+    datetimes = [start + datetime.timedelta(seconds=x * 37) for x in range(numOfCalls)]
+    durations = [datetime.timedelta(seconds=x % 7200) for x in range(numOfCalls)]
+    inputs = [
+        ('datetime_isoformat', isodate.datetime_isoformat, datetimes),
+        ('date_isoformat', isodate.date_isoformat, [value.date() for value in datetimes]),
+        ('duration_isoformat', isodate.duration_isoformat, durations),
+        ('strftime %H:%M:%S', lambda value: isodate.strftime(value, '%H:%M:%S'), durations)
+    ]
+    for name, function, values in inputs:
+        baseline = measure(name + ', compiled per call', uncached(function), values)
+        measure(name, function, values, baseline)
+
+if __name__ == '__main__':
+    main()
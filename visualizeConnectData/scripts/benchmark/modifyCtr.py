@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+# Compares the serial and batch processing modes of the ModifyCtr lambda against a stubbed S3
+# python3 modifyCtr.py [numOfCtrs] [latencyMs]
+
+import sys
+import stubs
+import lambda_function
+
+def newS3(body, objectKey, latencyMs):
+    s3 = stubs.StubS3Client(latencyMs)
+    s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+    return s3
+
+def run(name, mode, s3, body, objectKey, clearCache=True):
+    lambda_function.s3Client = s3
+    lambda_function.processingMode = mode
+    if clearCache:
+        lambda_function.lastUpdateIndex = lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)
+    s3.resetCounters()
+
+    event = stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body))
+    elapsed, summary = stubs.timeIt(lambda_function.lambda_handler, event, stubs.StubContext())
+
+    print('{:32} {:8.2f} s {:10.1f} records/s  written {} skipped {} failed {} duplicates {}  requests {}'.format(
+        name,
+        elapsed,
+        (summary['Written'] + summary['Skipped'] + summary['Failed'] + summary['Duplicates']) / elapsed,
+        summary['Written'],
+        summary['Skipped'],
+        summary['Failed'],
+        summary['Duplicates'],
+        s3.requests
+    ))
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latencyMs = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-1'
+    body = stubs.mockObject(stubs.mockCtrs(numOfCtrs))
+
+    print('{} CTRs, {} ms per S3 request, {} workers'.format(numOfCtrs, latencyMs, lambda_function.maxWorkers))
+    run('serial', 'serial', newS3(body, objectKey, latencyMs), body, objectKey)
+
+    s3 = newS3(body, objectKey, latencyMs)
+    run('batch', 'batch', s3, body, objectKey)
+
+    # Redelivery of the same object, the modified objects already exist
+    run('batch redelivered, cold cache', 'batch', s3, body, objectKey)
+    run('batch redelivered, warm cache', 'batch', s3, body, objectKey, clearCache=False)
+
+    # Several versions of every contact in the same object
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-2'
+    body = stubs.mockObject(stubs.mockVersions(stubs.mockCtrs(numOfCtrs // 3), 3))
+    run('batch, 3 versions per contact', 'batch', newS3(body, objectKey, latencyMs), body, objectKey)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+
+# Compares invoking the ModifyCtr lambda once per Firehose object with one invocation for a burst of objects, as an
+# S3 event with several records and as SQS messages, against a stubbed S3
+# python3 multiObject.py [numOfObjects] [numOfCtrs] [latencyMs]
+
+import sys
+import stubs
+import lambda_function
+
+def newS3(objects, latencyMs):
+    s3 = stubs.StubS3Client(latencyMs)
+    for objectKey, body in objects:
+        s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+    return s3
+
+def perObject(objects):
+    summaries = []
+    for objectKey, body in objects:
+        event = stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body))
+        summaries.append(lambda_function.lambda_handler(event, stubs.StubContext()))
+    return sum(summary['Written'] for summary in summaries)
+
+def multiRecord(objects):
+    event = stubs.s3ObjectsEvent([(stubs.BUCKET_NAME, objectKey, len(body)) for objectKey, body in objects])
+    return lambda_function.lambda_handler(event, stubs.StubContext())['Written']
+
+def queued(objects):
+    event = stubs.sqsEvent([stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)) for objectKey, body in objects])
+    return lambda_function.lambda_handler(event, stubs.StubContext())['Written']
+
+def run(name, function, objects, latencyMs, invocations):
+    s3 = newS3(objects, latencyMs)
+    lambda_function.s3Client = s3
+    lambda_function.lastUpdateIndex = lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)
+
+    elapsed, written = stubs.timeIt(function, objects)
+    print('{:28} {:8.2f} s  {:3} invocations  written {}  requests {}'.format(
+        name, elapsed, invocations, written, s3.requests))
+
+def main():
+    numOfObjects = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    numOfCtrs = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latencyMs = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    objects = [('ctr/year=2021/month=04/day=01/benchmark-{}'.format(index), stubs.mockObject(stubs.mockCtrs(numOfCtrs)))
+               for index in range(numOfObjects)]
+
+    print('{} objects of {} CTRs, {} ms per S3 request, {} object workers'.format(
+        numOfObjects, numOfCtrs, latencyMs, lambda_function.maxObjectWorkers))
+    run('one object per invocation', perObject, objects, latencyMs, numOfObjects)
+    run('S3 event of all objects', multiRecord, objects, latencyMs, 1)
+    run('SQS messages of all objects', queued, objects, latencyMs, 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+
+# Compares the json and parquet output formats of the ModifyCtr lambda: objects and bytes written, and the bytes a
+# query reading a few columns has to scan. Requires pyarrow
+# python3 parquetOutput.py [numOfCtrs]
+
+import sys
+import io
+import stubs
+import lambda_function
+import pyarrow.parquet
+
+# Columns used by a typical dashboard query
+QUERY_COLUMNS = ['InitiationTimestamp', 'Queue_Name', 'ContactDuration', 'IvrDuration']
+
+def run(outputFormat, body, objectKey):
+    s3 = stubs.StubS3Client(0)
+    s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+
+    lambda_function.s3Client = s3
+    lambda_function.outputFormat = outputFormat
+    lambda_function.lastUpdateIndex = lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)
+
+    event = stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body))
+    elapsed, summary = stubs.timeIt(lambda_function.lambda_handler, event, stubs.StubContext())
+
+    written = {key: obj['Body'] for (bucket, key), obj in s3.objects.items() if key != objectKey}
+    return elapsed, written
+
+def parquetScanBytes(body, columns):
+    # Athena only reads the column chunks a query references
+    metadata = pyarrow.parquet.ParquetFile(io.BytesIO(body)).metadata
+    names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+
+    scanned = 0
+    for rowGroup in range(metadata.num_row_groups):
+        for i, name in enumerate(names):
+            if name in columns:
+                scanned += metadata.row_group(rowGroup).column(i).total_compressed_size
+
+    return scanned
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-1'
+    body = stubs.mockObject(stubs.mockCtrs(numOfCtrs))
+
+    print('{} CTRs, query reads {}'.format(numOfCtrs, ', '.join(QUERY_COLUMNS)))
+    print('{:8} {:>8} {:>8} {:>14} {:>14}'.format('format', 'seconds', 'objects', 'bytes written', 'bytes scanned'))
+
+    elapsed, written = run('json', body, objectKey)
+    jsonBytes = sum(len(obj) for obj in written.values())
+    # JSON has to be read completely whatever columns the query uses
+    print('{:8} {:8.3f} {:8} {:14} {:14}'.format('json', elapsed, len(written), jsonBytes, jsonBytes))
+
+    elapsed, written = run('parquet', body, objectKey)
+    parquetBytes = sum(len(obj) for obj in written.values())
+    scanned = sum(parquetScanBytes(obj, QUERY_COLUMNS) for obj in written.values())
+    print('{:8} {:8.3f} {:8} {:14} {:14}'.format('parquet', elapsed, len(written), parquetBytes, scanned))
+
+if __name__ == '__main__':
+    main()
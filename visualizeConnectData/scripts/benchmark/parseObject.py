@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+# Compares time and peak memory of reading a Firehose object in one go against the streaming parseObject, for plain
+# and GZIP compressed objects
+# python3 parseObject.py [numOfCtrs]
+
+import sys
+import gzip
+import json
+import tracemalloc
+import stubs
+import lambda_function
+
+def readWholeObject(bucketName, objectKey):
+    # parseObject before it was changed to stream the object
+    body = lambda_function.s3Client.get_object(Bucket=bucketName, Key=objectKey)['Body'].read()
+
+    bodyString = body.decode('utf-8')
+    bodyStringParts = bodyString.splitlines()
+
+    bodyJson = []
+    for part in bodyStringParts:
+        bodyJson.append(json.loads(part))
+
+    return bodyJson
+
+def consume(records):
+    count = 0
+    for record in records:
+        count += 1
+    return count
+
+def measure(name, function):
+    tracemalloc.start()
+    elapsed, count = stubs.timeIt(function)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:10} {:8} records {:8.3f} s  peak {:8.2f} MB'.format(name, count, elapsed, peak / (1024 * 1024)))
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    objectKey = 'ctr/year=2021/month=04/day=01/benchmark-1'
+    body = stubs.mockObject(stubs.mockCtrs(numOfCtrs))
+
+    s3 = stubs.StubS3Client(0)
+    s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+    lambda_function.s3Client = s3
+
+    compressedKey = 'ctr/year=2021/month=04/day=01/benchmark-1.gz'
+    compressed = {'Body': gzip.compress(body), 'Metadata': {}}
+    s3.objects[(stubs.BUCKET_NAME, compressedKey)] = compressed
+    print('{} CTRs, {:.2f} MB object, {:.2f} MB with GZIP ({:.1f}x smaller)'.format(
+        numOfCtrs, len(body) / (1024 * 1024), len(compressed['Body']) / (1024 * 1024),
+        len(body) / len(compressed['Body'])))
+    measure('whole', lambda: consume(readWholeObject(stubs.BUCKET_NAME, objectKey)))
+    measure('streaming', lambda: consume(lambda_function.parseObject(stubs.BUCKET_NAME, objectKey)))
+    measure('gzip', lambda: consume(lambda_function.parseObject(stubs.BUCKET_NAME, compressedKey)))
+
+if __name__ == '__main__':
+    main()
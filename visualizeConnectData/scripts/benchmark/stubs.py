@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+# Shared helpers for the local benchmarks, run the benchmarks from this folder
+# python3 modifyCtr.py
+
+import sys
+sys.path.insert(1, '../mockCTRs')
+sys.path.insert(1, '../../lambdas/modifyCTR')
+
+import os
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('CTRModifiedS3Folder', 'ctrmodified')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import io
+import json
+import random
+import base64
+import time
+import datetime
+import threading
+import importlib.util
+from urllib.parse import quote
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+import create
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+BUCKET_NAME = 'benchmark-connect-ctr'
+
+class StubS3Client:
+    # In memory S3, every request sleeps for latencyMs to stand in for the network round trip, plus up to jitterMs so
+    # concurrent requests can complete in any order
+    def __init__(self, latencyMs=10, jitterMs=0):
+        self.latency = latencyMs / 1000
+        self.jitter = jitterMs / 1000
+        self.objects = {}
+        self.requests = {}
+        self.bytesWritten = 0
+        self.lock = threading.Lock()
+
+    def resetCounters(self):
+        with self.lock:
+            self.requests = {}
+            self.bytesWritten = 0
+
+    def request(self, name):
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def getStored(self, operation, bucket, key):
+        obj = self.objects.get((bucket, key))
+        if obj is None:
+            code = 'NoSuchKey' if operation == 'GetObject' else '404'
+            raise ClientError({'Error': {'Code': code, 'Message': 'Not Found'}}, operation)
+
+        return obj
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.request('PutObject')
+        body = Body if isinstance(Body, bytes) else bytes(Body)
+        with self.lock:
+            self.bytesWritten += len(body)
+            self.objects[(Bucket, Key)] = {
+                'Body': body,
+                'Metadata': kwargs.get('Metadata', {}),
+                'ContentEncoding': kwargs.get('ContentEncoding')
+            }
+        return {}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.request('GetObject')
+        obj = self.getStored('GetObject', Bucket, Key)
+        response = {
+            'Body': StreamingBody(io.BytesIO(obj['Body']), len(obj['Body'])),
+            'ContentLength': len(obj['Body']),
+            'Metadata': obj['Metadata']
+        }
+        if obj.get('ContentEncoding') is not None:
+            response['ContentEncoding'] = obj['ContentEncoding']
+        return response
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self.request('HeadObject')
+        obj = self.getStored('HeadObject', Bucket, Key)
+        return {'ContentLength': len(obj['Body']), 'Metadata': obj['Metadata']}
+
+class StubContext:
+    function_name = 'benchmark'
+    function_version = '$LATEST'
+
+def mockCtrs(numOfCtrs, year=2021, month=4, day=1):
+    return [json.loads(create.createCTR(ACCOUNT_ID, REGION, year, month, day)) for x in range(numOfCtrs)]
+
+def mockVersions(ctrs, numOfVersions):
+    # Connect sends an updated CTR when a contact changes, each version gets a later LastUpdateTimestamp
+    versions = []
+    for version in range(numOfVersions):
+        for ctr in ctrs:
+            ctrVersion = dict(ctr)
+            lastUpdateTimestamp = datetime.datetime.strptime(ctr['LastUpdateTimestamp'], '%Y-%m-%dT%H:%M:%SZ')
+            lastUpdateTimestamp += datetime.timedelta(minutes=version)
+            ctrVersion['LastUpdateTimestamp'] = lastUpdateTimestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+            versions.append(ctrVersion)
+
+    return versions
+
+def mockObject(ctrs):
+    # firehoseAddNewLine adds the newline after each record
+    return ''.join(json.dumps(ctr) + '\n' for ctr in ctrs).encode('utf-8')
+
+def s3Event(bucketName, objectKey, size):
+    return s3ObjectsEvent([(bucketName, objectKey, size)])
+
+def s3ObjectsEvent(objects):
+    # One record per (bucketName, objectKey, size)
+    return {
+        'Records': [{
+            's3': {
+                'bucket': {'name': bucketName},
+                'object': {'key': quote(objectKey), 'size': size}
+            }
+        } for bucketName, objectKey, size in objects]
+    }
+
+def sqsEvent(bodies):
+    # S3 sends its events to the queue as the message body, bodies that are not str are sent as JSON
+    return {
+        'Records': [{
+            'messageId': 'message-{}'.format(index),
+            'eventSource': 'aws:sqs',
+            'body': body if isinstance(body, str) else json.dumps(body)
+        } for index, body in enumerate(bodies)]
+    }
+
+def loadLambda(name):
+    # The lambdas are all named lambda_function, modifyCTR is the one on the path
+    spec = importlib.util.spec_from_file_location(name, '../../lambdas/{}/lambda_function.py'.format(name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def firehoseEvent(payloads):
+    # Transformation event Firehose sends to its processing lambda, one record per payload
+    records = []
+    for index, payload in enumerate(payloads):
+        records.append({
+            'recordId': '{:056d}'.format(index),
+            'approximateArrivalTimestamp': 1617272100000,
+            'data': base64.b64encode(payload).decode('ascii')
+        })
+
+    return {
+        'invocationId': 'benchmark',
+        'deliveryStreamArn': 'arn:aws:firehose:{}:{}:deliverystream/benchmark'.format(REGION, ACCOUNT_ID),
+        'region': REGION,
+        'records': records
+    }
+
+def timeIt(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
@@ -0,0 +1,39 @@
+#!/usr/bin/python
+
+# Compares the time per call of the ctr_timestamps parsers against strptime for the timestamps of the mock CTRs
+# python3 timestamps.py [numOfCtrs]
+
+import sys
+import time
+import datetime
+import stubs
+import ctr_timestamps
+
+CTR_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def measure(name, function, values, baseline=None):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    elapsed = time.perf_counter() - start
+
+    perCall = elapsed / len(values) * 1000000000
+    speedup = '' if baseline is None else '{:7.2f}x'.format(baseline / perCall)
+    print('{:30} {:8.0f} ns/call {}'.format(name, perCall, speedup))
+    return perCall
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    ctrs = stubs.mockCtrs(numOfCtrs)
+    values = [ctr[key] for ctr in ctrs for key in ['InitiationTimestamp', 'DisconnectTimestamp', 'LastUpdateTimestamp']]
+    print('{} CTR timestamps, {} distinct'.format(len(values), len(set(values))))
+
+    baseline = measure('strptime', lambda value: datetime.datetime.strptime(value, CTR_TIMESTAMP_FORMAT), values)
+    measure('parseCtrTimestamp, no cache', ctr_timestamps.parseCtrTimestamp.__wrapped__, values, baseline)
+    ctr_timestamps.parseCtrTimestamp.cache_clear()
+    measure('parseCtrTimestamp', ctr_timestamps.parseCtrTimestamp, values, baseline)
+    print('cache {}'.format(ctr_timestamps.parseCtrTimestamp.cache_info()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+# Per record time of modifyFlattenData against the version that scanned the record for every step
+# python3 transform.py [numOfCtrs]
+
+import sys
+import copy
+import time
+import datetime
+import stubs
+import isodate
+import lambda_function
+
+def legacyModifyFlattenData(jsonData):
+    # modifyFlattenData before the transform pipeline
+    for key in jsonData:
+        if 'timestamp' in key.lower():
+            value = jsonData[key]
+
+            if value is not None:
+                modifiedTimestamp = value.replace('T', ' ')
+                modifiedTimestamp = modifiedTimestamp.replace('Z', '')
+                jsonData[key] = modifiedTimestamp
+
+    if 'Attributes_udCity' in jsonData:
+        geo = lambda_function.geoEnricher.get(jsonData['Attributes_udCity'])
+        if (geo != None):
+            jsonData['Attributes_udCity_Latitude'] = geo['Latitude']
+            jsonData['Attributes_udCity_Longitude'] = geo['Longitude']
+            jsonData['Attributes_udCity_State'] = geo['State']
+
+    if 'Attributes_udProjectTime' in jsonData:
+        ptDuration = isodate.parse_duration(jsonData['Attributes_udProjectTime'])
+        jsonData['Attributes_udProjectTime'] = int(ptDuration.total_seconds())
+
+    dateFormat = '%Y-%m-%d %H:%M:%S'
+    initiationTimestamp = datetime.datetime.strptime(jsonData['InitiationTimestamp'], dateFormat)
+    disconnectTimestamp = datetime.datetime.strptime(jsonData['DisconnectTimestamp'], dateFormat)
+    jsonData['ContactDuration'] = int((disconnectTimestamp - initiationTimestamp).total_seconds())
+
+    if 'Queue_EnqueueTimestamp' in jsonData:
+        enqueueTimestamp = datetime.datetime.strptime(jsonData['Queue_EnqueueTimestamp'], dateFormat)
+        jsonData['IvrDuration'] = int((enqueueTimestamp - initiationTimestamp).total_seconds())
+    else:
+        jsonData['IvrDuration'] = jsonData['ContactDuration']
+
+    if 'Agent_AfterContactWorkDuration' in jsonData:
+        if (jsonData['Agent_CustomerHoldDuration'] > 0):
+            jsonData['Agent_TalkDuration'] = jsonData['Agent_AfterContactWorkDuration'] - jsonData['Agent_CustomerHoldDuration']
+        else:
+            jsonData['Agent_TalkDuration'] = jsonData['Agent_AfterContactWorkDuration']
+
+    jsonDataSorted = dict(sorted(jsonData.items()))
+    return jsonDataSorted
+
+def measure(name, function, records, baseline=None):
+    # Both functions change the record, every run gets its own copies
+    records = copy.deepcopy(records)
+
+    start = time.perf_counter()
+    for record in records:
+        function(record)
+    elapsed = time.perf_counter() - start
+
+    perRecord = elapsed / len(records) * 1000000
+    speedup = '' if baseline is None else '{:6.2f}x'.format(baseline / perRecord)
+    print('{:24} {:8.2f} us/record {}'.format(name, perRecord, speedup))
+    return perRecord
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    records = [lambda_function.flatten(ctr, '_') for ctr in stubs.mockCtrs(numOfCtrs)]
+
+    print('{} CTRs'.format(numOfCtrs))
+
+    baseline = measure('previous', legacyModifyFlattenData, records)
+    measure('modifyFlattenData', lambda_function.modifyFlattenData, records, baseline)
+
+if __name__ == '__main__':
+    main()
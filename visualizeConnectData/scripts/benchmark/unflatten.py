@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+# Compares the time of unflatten and unflatten_list with the implementations from flatten_json 0.1.7 on flattened mock
+# CTRs
+# python3 unflatten.py [numOfCtrs]
+
+import sys
+import time
+import stubs
+import flatten_json
+from util import check_if_numbers_are_consecutive
+
+# unflatten and unflatten_list from flatten_json 0.1.7
+def legacyUnflatten(flat_dict, separator='_'):
+    """
+    Creates a hierarchical dictionary from a flattened dictionary
+    Assumes no lists are present
+    :param flat_dict: a dictionary with no hierarchy
+    :param separator: a string that separates keys
+    :return: a dictionary with hierarchy
+    """
+
+    # This global dictionary is mutated and returned
+    unflattened_dict = dict()
+
+    def _unflatten(dic, keys, value):
+        for key in keys[:-1]:
+            dic = dic.setdefault(key, {})
+
+        dic[keys[-1]] = value
+
+    list_keys = sorted(flat_dict.keys())
+    for i, item in enumerate(list_keys):
+        if i != len(list_keys) - 1:
+            if not list_keys[i + 1].startswith(list_keys[i]):
+                _unflatten(unflattened_dict, item.split(separator),
+                           flat_dict[item])
+            else:
+                pass  # if key contained in next key, json will be invalid.
+        else:
+            #  last element
+            _unflatten(unflattened_dict, item.split(separator),
+                       flat_dict[item])
+    return unflattened_dict
+
+
+def legacyUnflattenList(flat_dict, separator='_'):
+    """
+    Unflattens a dictionary, first assuming no lists exist and then tries to
+    identify lists and replaces them
+    This is probably not very efficient and has not been tested extensively
+    Feel free to add test cases or rewrite the logic
+    Issues that stand out to me:
+    - Sorting all the keys in the dictionary, which specially for the root
+    dictionary can be a lot of keys
+    - Checking that numbers are consecutive is O(N) in number of keys
+
+    :param flat_dict: dictionary with no hierarchy
+    :param separator: a string that separates keys
+    :return: a dictionary with hierarchy
+    """
+
+    # First unflatten the dictionary assuming no lists exist
+    unflattened_dict = legacyUnflatten(flat_dict, separator)
+
+    def _convert_dict_to_list(object_, parent_object, parent_object_key):
+        if isinstance(object_, dict):
+            for key in object_:
+                if isinstance(object_[key], dict):
+                    _convert_dict_to_list(object_[key], object_, key)
+            try:
+                keys = [int(key) for key in object_]
+                keys.sort()
+            except (ValueError, TypeError):
+                keys = []
+            keys_len = len(keys)
+
+            if (keys_len > 0 and sum(keys) ==
+                    int(((keys_len - 1) * keys_len) / 2) and keys[0] == 0 and
+                    keys[-1] == keys_len - 1 and
+                    check_if_numbers_are_consecutive(keys)):
+
+                # The dictionary looks like a list so we're going to replace it
+                parent_object[parent_object_key] = []
+                for key_index, key in enumerate(keys):
+                    parent_object[parent_object_key].append(object_[str(key)])
+                    # The list item we just added might be a list itself
+                    # https://github.com/amirziai/flatten/issues/15
+                    _convert_dict_to_list(parent_object[parent_object_key][-1],
+                                          parent_object[parent_object_key],
+                                          key_index)
+
+    _convert_dict_to_list(unflattened_dict, None, None)
+    return unflattened_dict
+
+
+def wideCtr(ctr, numOfAttributes):
+    # Contact flows can set many attributes, and lists of references become dictionaries with index keys
+    ctr = dict(ctr)
+    ctr['Attributes'] = {'attribute{}'.format(x): 'value{}'.format(x) for x in range(numOfAttributes)}
+    ctr['References'] = [{'Name': 'Reference{}'.format(x), 'Value': [x, {'Type': 'URL'}]} for x in range(numOfAttributes // 10)]
+    return ctr
+
+def measure(name, function, flatCtrs, baseline=None):
+    # Best of 5 runs
+    elapsed = None
+    for run in range(5):
+        start = time.perf_counter()
+        for flatCtr in flatCtrs:
+            function(flatCtr, '.')
+        runElapsed = time.perf_counter() - start
+        elapsed = runElapsed if elapsed is None else min(elapsed, runElapsed)
+
+    perRecord = elapsed / len(flatCtrs) * 1000000
+    speedup = '' if baseline is None else '{:6.2f}x'.format(baseline / perRecord)
+    print('{:28} {:10.2f} us/record {}'.format(name, perRecord, speedup))
+    return perRecord
+
+def main():
+    numOfCtrs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ctrs = stubs.mockCtrs(numOfCtrs)
+
+    for numOfAttributes in [0, 100, 1000]:
+        flatCtrs = [flatten_json.flatten(wideCtr(ctr, numOfAttributes), '.') if numOfAttributes else flatten_json.flatten(ctr, '.') for ctr in ctrs]
+
+        print('{} CTRs, {} extra attributes, {:.0f} keys per record'.format(numOfCtrs, numOfAttributes, sum(len(flatCtr) for flatCtr in flatCtrs) / numOfCtrs))
+        baseline = measure('unflatten 0.1.7', legacyUnflatten, flatCtrs)
+        measure('unflatten', flatten_json.unflatten, flatCtrs, baseline)
+        baseline = measure('unflatten_list 0.1.7', legacyUnflattenList, flatCtrs)
+        measure('unflatten_list', flatten_json.unflatten_list, flatCtrs, baseline)
+
+        # The wide records are slow with 0.1.7, use fewer of them
+        ctrs = ctrs[:max(1, len(ctrs) // 4)]
+        numOfCtrs = len(ctrs)
+
+if __name__ == '__main__':
+    main()
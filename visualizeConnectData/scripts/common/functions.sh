@@ -16,4 +16,9 @@ function PackageLambdaS3 () {
     cd $ThisDir
     
     eval "$2=$LambdaZipFileWithCheckSum"
-}
\ No newline at end of file
+}
+function HasContactVersions () {
+    # Parquet output and fused mode keep every version of a contact, json output in separate mode overwrites the
+    # modified object of the contact with its newest version
+    [[ "$OutputFormat" == "parquet" || "$PipelineMode" == "fused" ]]
+}
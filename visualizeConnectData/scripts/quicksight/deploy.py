@@ -561,6 +561,7 @@ def main(
     athenaCatalog,
     athenaDatabaseName,
     athenaTableName,
+    athenaDatasetTableName,
     athenaS3Output,
     quickSightTemplateDatasetPlaceholder,
     quickSightTemplateArn):
@@ -572,6 +573,7 @@ def main(
 
     dataSourceArn = createDataSource(accountId, qsUserArn, '{0}DataSource'.format(prefix))
     
+    #The dataset reads the table or the latest view, the view has the columns of the table
     datasetArn = createDataset(
         accountId, 
         qsUserArn, 
@@ -579,7 +581,7 @@ def main(
         tableInfo, 
         athenaCatalog,
         athenaDatabaseName,
-        athenaTableName,
+        athenaDatasetTableName,
         '{0}Dataset'.format(prefix)
     )
     
@@ -603,5 +605,6 @@ if __name__ == '__main__':
         sys.argv[4], 
         sys.argv[5], 
         sys.argv[6], 
-        sys.argv[7]
+        sys.argv[7],
+        sys.argv[8]
     )  
\ No newline at end of file
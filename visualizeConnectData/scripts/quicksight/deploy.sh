@@ -1,7 +1,16 @@
 #!/bin/bash
 
+source ../common/functions.sh
 source ../common/parameters.ini
 
+# The dataset reads the latest view created by scripts/athena/deploy.sh only when the table holds several versions of
+# a contact
+AthenaDatasetTableName=$AthenaTableName
+if HasContactVersions
+then
+    AthenaDatasetTableName=$AthenaViewName
+fi
+
 python3 deploy.py $Prefix \
-    $AthenaCatalog $AthenaDatabaseName $AthenaTableName $AthenaS3Output \
+    $AthenaCatalog $AthenaDatabaseName $AthenaTableName $AthenaDatasetTableName $AthenaS3Output \
     $QuickSightTemplateDatasetPlaceholder $QuickSightTemplateArn
\ No newline at end of file
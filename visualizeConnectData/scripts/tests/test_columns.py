@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+# Tests of ctr_columns against the scalar timestamp and duration parsers, and of the parquet files written from the
+# columns computed per object, run from this folder. Requires pyarrow
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import io
+import random
+import unittest
+import stubs
+import lambda_function
+import ctr_columns
+
+try:
+    import numpy
+    import pyarrow.parquet
+    import columns
+except ImportError:
+    columns = None
+
+def randomTimestamp(layout):
+    value = '{:04d}-{:02d}-{:02d}{}{:02d}:{:02d}:{:02d}{}'.format(
+        random.choice([1, 1970, 2000, 2020, 2021, 2100, 9999]), random.randint(0, 13), random.randint(0, 32),
+        'T' if layout is ctr_columns.CTR else ' ', random.randint(0, 24), random.randint(0, 60), random.randint(0, 60),
+        'Z' if layout is ctr_columns.CTR else '')
+
+    change = random.random()
+    if change < 0.05:
+        position = random.randrange(len(value))
+        value = value[:position] + random.choice('0T Z-:+١x') + value[position + 1:]
+    elif change < 0.1:
+        value = random.choice(['', value[:-1], value + 'Z', value.replace('-0', '-'), value.replace(':0', ':')])
+    return value
+
+def scalarSeconds(parse, value):
+    try:
+        return (parse(value) - ctr_columns.EPOCH).total_seconds()
+    except (ValueError, TypeError):
+        return None
+
+def readTable(body):
+    return pyarrow.parquet.read_table(io.BytesIO(body))
+
+@unittest.skipIf(columns is None, 'requires pyarrow')
+class TestColumns(unittest.TestCase):
+    def test_timestamps_match_scalar_parser(self):
+        random.seed(7)
+        for layout in [ctr_columns.CTR, ctr_columns.MODIFIED]:
+            values = [randomTimestamp(layout) for x in range(5000)] + [None]
+            expected = [scalarSeconds(layout[3], value) for value in values]
+            for column in [values, numpy.array([value or '' for value in values])]:
+                actual = ctr_columns.parseTimestamps(column, layout).tolist()
+                for value, e, a in zip(values, expected, actual):
+                    self.assertEqual(a, e, repr(value))
+
+    def test_durations_match_scalar_parser(self):
+        random.seed(7)
+        values = [random.choice(['PT{}S', 'PT{}M', 'P{}D', 'P{}Y', 'PT{}H{}S', '{}', 'P{}W']).format(
+            random.randint(0, 100000), random.randint(0, 59)) for x in range(5000)] + [None, '']
+        actual = ctr_columns.parseDurations(values).tolist()
+        for value, a in zip(values, actual):
+            try:
+                e = ctr_columns.durationSeconds(value)
+            except Exception:
+                e = None
+            self.assertEqual(a, e, repr(value))
+
+    def flattened(self, numOfCtrs):
+        ctrs = stubs.mockCtrs(numOfCtrs)
+        lambda_function.enrichmentStage.prepare(ctrs)
+        return [lambda_function.flattenCtr(stubs.BUCKET_NAME, 'ctr/benchmark', ctr) for ctr in ctrs]
+
+    def test_rows_failing_the_transform_are_dropped(self):
+        # The rows the per record transform fails are the ones durationColumns reports
+        flattened = self.flattened(3)
+        broken = [dict(flattened[0], InitiationTimestamp=None), dict(flattened[1], Attributes_udProjectTime='P'),
+                  dict(flattened[2], Queue_EnqueueTimestamp='2021-04-01 25:00:00')]
+        for row in broken:
+            with self.assertRaises((KeyError, ValueError)):
+                lambda_function.ctrTransform.transform(dict(row))
+
+        rows = [lambda_function.ctrColumnTransform.transform(dict(row)) for row in broken + flattened]
+        computed, errors = ctr_columns.durationColumns(rows, lambda_function.projectTimeEnrichment.lookup)
+        self.assertEqual(sorted(errors), [0, 1, 2])
+
+    def test_parquet_per_object_matches_per_record(self):
+        flattened = self.flattened(500)
+        expected = readTable(columns.perRecord([dict(row) for row in flattened]))
+        actual = readTable(columns.perObject([dict(row) for row in flattened]))
+        self.assertTrue(expected.equals(actual))
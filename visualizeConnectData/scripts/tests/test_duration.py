@@ -0,0 +1,49 @@
+#!/usr/bin/python
+
+# Tests of the isodate.parse_duration fast path against the full parser for random durations, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import random
+import unittest
+import stubs
+import isodate
+import duration
+
+def randomDuration():
+    parts = ['P']
+    for designator in ['Y', 'M', 'W', 'D']:
+        if random.random() < (0.5 if designator == 'D' else 0.05):
+            parts.append('{}{}'.format(random.choice([0, 1, 12, 365, 999999999, 1000000000]), designator))
+    if random.random() < 0.8:
+        parts.append('T')
+        for designator in ['H', 'M', 'S']:
+            if random.random() < 0.5:
+                number = random.choice(['0', '7', '59', '3600', '999999999', '1000000000', '1.5', '2,25', '01'])
+                parts.append(number + designator)
+    value = ''.join(parts)
+
+    change = random.random()
+    if change < 0.05:
+        value = random.choice(['+', '-', ' ']) + value
+    elif change < 0.1:
+        value = value + random.choice(['\n', 'T', 'S', ' '])
+    return value
+
+def outcome(function, value):
+    try:
+        return function(value)
+    except (ValueError, OverflowError) as e:
+        return type(e)
+
+class TestParseDuration(unittest.TestCase):
+    def test_matches_full_parser(self):
+        random.seed(7)
+        for x in range(20000):
+            value = randomDuration()
+            expected = outcome(duration.fullParse, value)
+            actual = outcome(isodate.parse_duration, value)
+            self.assertEqual(actual, expected, repr(value))
+            self.assertEqual(type(actual), type(expected), repr(value))
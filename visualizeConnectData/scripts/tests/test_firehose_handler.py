@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+# Tests of the ModifyCtr lambda as the Firehose transformation of fused mode, against the separate pipeline, run from
+# this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import json
+import base64
+import unittest
+from unittest import mock
+import stubs
+import lambda_function
+
+firehoseAddNewLine = stubs.loadLambda('firehoseAddNewLine')
+
+def encoded(ctrs):
+    return [json.dumps(ctr).encode('utf-8') for ctr in ctrs]
+
+def decoded(records):
+    return [json.loads(base64.b64decode(record['data'])) for record in records]
+
+class TestFirehoseHandler(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(lambda_function, 'ctrBucket', stubs.BUCKET_NAME)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def handle(self, payloads):
+        event = stubs.firehoseEvent(payloads)
+        output = lambda_function.firehose_handler(event, stubs.StubContext())['records']
+        self.assertEqual([record['recordId'] for record in output], [record['recordId'] for record in event['records']])
+        return output
+
+    def test_superseded_versions_are_dropped(self):
+        # The newest version is neither the first nor the last one in the batch
+        versions = stubs.mockVersions(stubs.mockCtrs(5), 3)
+        output = self.handle(encoded(versions[5:10] + versions[10:] + versions[:5]))
+        self.assertEqual([record['result'] for record in output], ['Dropped'] * 5 + ['Ok'] * 5 + ['Dropped'] * 5)
+
+        expected = [lambda_function.transformCtr(stubs.BUCKET_NAME, None, ctr) for ctr in versions[10:]]
+        self.assertEqual(decoded(output[5:10]), expected)
+
+    def test_every_version_without_dedupe(self):
+        versions = stubs.mockVersions(stubs.mockCtrs(5), 3)
+        with mock.patch.object(lambda_function, 'dedupe', False):
+            output = self.handle(encoded(versions))
+        self.assertEqual([record['result'] for record in output], ['Ok'] * 15)
+
+    def test_undecodable_records_fail(self):
+        # Failed records keep their original data for the error output of Firehose
+        payloads = [b'{"ContactId": ', b'\xff\xfe'] + encoded(stubs.mockCtrs(1))
+        with self.assertLogs(lambda_function.logger, 'ERROR'):
+            output = self.handle(payloads)
+        self.assertEqual([record['result'] for record in output], ['ProcessingFailed', 'ProcessingFailed', 'Ok'])
+        self.assertEqual([base64.b64decode(record['data']) for record in output[:2]], payloads[:2])
+
+    def test_records_failing_the_transform_fail(self):
+        ctrs = stubs.mockCtrs(2)
+        with self.assertLogs(lambda_function.logger, 'ERROR'):
+            output = self.handle(encoded([dict(ctrs[0], InitiationTimestamp=None), ctrs[1]]))
+        self.assertEqual([record['result'] for record in output], ['ProcessingFailed', 'Ok'])
+
+    def test_partition_keys(self):
+        # Same keys as FirehoseAddNewLine, only with dynamic partitioning
+        ctrs = stubs.mockCtrs(20)
+        ctrs[0] = dict(ctrs[0], InitiationTimestamp='2021-03-31T23:59:00Z', Channel='VOICE')
+        self.assertNotIn('metadata', self.handle(encoded(ctrs))[0])
+
+        event = stubs.firehoseEvent(encoded(ctrs))
+        with mock.patch.object(lambda_function, 'dynamicPartitioning', True), \
+                mock.patch.object(firehoseAddNewLine, 'dynamicPartitioning', True):
+            actual = lambda_function.firehose_handler(event, stubs.StubContext())['records']
+            expected = firehoseAddNewLine.lambda_handler(event, stubs.StubContext())['records']
+        self.assertEqual(actual[0]['metadata']['partitionKeys'],
+                         {'year': '2021', 'month': '03', 'day': '31', 'channel': 'VOICE'})
+        self.assertEqual([record['metadata'] for record in actual], [record['metadata'] for record in expected])
+
+class TestFusedPipeline(unittest.TestCase):
+    def modifiedCtrs(self, bodies):
+        # Source_Key names the object the CTR was read from, which fused mode does not have
+        ctrs = {}
+        for body in bodies:
+            for line in body.splitlines():
+                ctr = json.loads(line)
+                ctr.pop('Source_Key')
+                ctrs[ctr['ContactId']] = ctr
+        return ctrs
+
+    def separate(self, event):
+        # Firehose concatenates the records of FirehoseAddNewLine into one object, the S3 event then invokes ModifyCtr
+        s3 = stubs.StubS3Client(0)
+        objectKey = 'ctr/year=2021/month=04/day=01/test-1'
+        response = firehoseAddNewLine.lambda_handler(event, stubs.StubContext())
+        body = b''.join(base64.b64decode(record['data']) for record in response['records'])
+        s3.put_object(Bucket=stubs.BUCKET_NAME, Key=objectKey, Body=body)
+
+        with mock.patch.object(lambda_function, 's3Client', s3), \
+                mock.patch.object(lambda_function, 'lastUpdateIndex',
+                                  lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize)):
+            lambda_function.lambda_handler(stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)), stubs.StubContext())
+        return self.modifiedCtrs(obj['Body'] for (bucket, key), obj in s3.objects.items()
+                                 if key.startswith('ctrmodified/'))
+
+    def fused(self, event):
+        # Firehose writes the records the transformation returns as Ok
+        with mock.patch.object(lambda_function, 'ctrBucket', stubs.BUCKET_NAME):
+            response = lambda_function.firehose_handler(event, stubs.StubContext())
+        return self.modifiedCtrs([b''.join(base64.b64decode(record['data']) for record in response['records']
+                                           if record['result'] == 'Ok')])
+
+    def test_same_modified_ctrs(self):
+        ctrs = stubs.mockCtrs(30)
+        for records in [ctrs, stubs.mockVersions(ctrs, 3)]:
+            event = stubs.firehoseEvent(encoded(records))
+            self.assertEqual(self.fused(event), self.separate(event))
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+
+# Tests of the FirehoseAddNewLine lambda, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import json
+import base64
+import unittest
+from unittest import mock
+import stubs
+
+firehoseAddNewLine = stubs.loadLambda('firehoseAddNewLine')
+
+class TestAddNewLine(unittest.TestCase):
+    def test_every_padding(self):
+        # Payload lengths cover every length mod 3, so the data ends on a full quantum, or with one or two padding
+        # characters
+        payloads = [json.dumps(stubs.mockCtrs(1)[0]).encode('utf-8')[:length] for length in range(0, 12)]
+        payloads += [b'\xff\x00\n' * length for length in range(1, 4)]
+        event = stubs.firehoseEvent(payloads)
+        output = firehoseAddNewLine.lambda_handler(event, stubs.StubContext())['records']
+
+        self.assertEqual([record['recordId'] for record in output], [record['recordId'] for record in event['records']])
+        for payload, record in zip(payloads, output):
+            self.assertEqual(record['result'], 'Ok')
+            self.assertEqual(record['data'], base64.b64encode(payload + b'\n').decode('ascii'))
+            self.assertNotIn('metadata', record)
+
+class TestPartitionKeys(unittest.TestCase):
+    def partitionKeys(self, payloads):
+        event = stubs.firehoseEvent(payloads)
+        with mock.patch.object(firehoseAddNewLine, 'dynamicPartitioning', True):
+            output = firehoseAddNewLine.lambda_handler(event, stubs.StubContext())['records']
+        return [record['metadata']['partitionKeys'] for record in output]
+
+    def test_initiation_date_and_channel(self):
+        # A CTR received after midnight is partitioned by the day it was initiated
+        ctr = dict(stubs.mockCtrs(1)[0], InitiationTimestamp='2021-03-31T23:59:00Z', Channel='VOICE')
+        self.assertEqual(self.partitionKeys([json.dumps(ctr).encode('utf-8')]),
+                         [{'year': '2021', 'month': '03', 'day': '31', 'channel': 'VOICE'}])
+
+    def test_arrival_time_fallback(self):
+        # Records that are not CTRs, or whose InitiationTimestamp is not a date, are partitioned by the time Firehose
+        # received them, 2021-04-01 in stubs.firehoseEvent
+        ctr = stubs.mockCtrs(1)[0]
+        payloads = [b'not a CTR', b'[1, 2]', json.dumps(dict(ctr, InitiationTimestamp='2021-13-01T00:00:00Z',
+                                                             Channel='')).encode('utf-8'),
+                    json.dumps(dict(ctr, InitiationTimestamp=None, Channel='CHAT')).encode('utf-8')]
+        arrival = {'year': '2021', 'month': '04', 'day': '01'}
+        self.assertEqual(self.partitionKeys(payloads), [arrival, arrival, arrival, dict(arrival, channel='CHAT')])
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+# Tests of the flatten_json command line, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+import stubs
+import flatten_json
+import flattenCli
+
+class TestFlattenCli(unittest.TestCase):
+    def test_library_call_ignores_process_arguments(self):
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['backfill.py', '--not-a-flatten-option']):
+            flatten_json.cli(io.StringIO('{"a": {"b": 1}}'), output, [])
+        self.assertEqual(json.loads(output.getvalue()), {'a_b': 1})
+
+    def test_defaults_are_resolved_when_called(self):
+        # Streams and arguments replaced after flatten_json is imported, as the script entry point sees them
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['flatten_json.py', '--separator', '.']), \
+                mock.patch.object(sys, 'stdin', io.StringIO('{"a": {"b": [1]}}')), \
+                mock.patch.object(sys, 'stdout', output):
+            flatten_json.cli()
+        self.assertEqual(json.loads(output.getvalue()), {'a.b.0': 1})
+
+    def test_bad_lines_are_skipped(self):
+        ctrs = stubs.mockCtrs(3)
+        lines = [json.dumps(ctrs[0]), '{"ContactId": ', '[1, 2]', json.dumps(ctrs[1]) + json.dumps(ctrs[2])]
+        expected = [flatten_json.flatten(ctr) for ctr in ctrs]
+
+        for workers in ['1', '2']:
+            output = io.StringIO()
+            errors = io.StringIO()
+            with mock.patch.object(sys, 'stderr', errors):
+                flatten_json.cli(io.StringIO('\n'.join(lines) + '\n'), output,
+                                 ['--ndjson', '--report', '--workers', workers])
+
+            self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()], expected)
+            report = errors.getvalue().splitlines()
+            self.assertEqual([line.split(':')[0] for line in report[:2]], ['line 2', 'line 3'])
+            self.assertTrue(report[2].startswith('3 records in '))
+            self.assertTrue(report[2].endswith(', 2 bad lines'))
+
+    def test_workers_match_flatten(self):
+        # The script reads and writes files as in the benchmark, the output matches flatten in order, or in any order
+        # with --unordered
+        ctrs = stubs.mockCtrs(300)
+        expected = sorted((flatten_json.flatten(ctr, '_', {'Recordings'}) for ctr in ctrs),
+                          key=lambda record: record['ContactId'])
+        with tempfile.TemporaryDirectory() as folder:
+            inputPath = os.path.join(folder, 'ctrs.json')
+            outputPath = os.path.join(folder, 'flattened.json')
+            with open(inputPath, 'wb') as inputFile:
+                inputFile.write(stubs.mockObject(ctrs))
+
+            for workers, ordered in [(1, True), (2, True), (2, False), (4, False)]:
+                args = ['--workers', str(workers), '--root-keys-to-ignore', 'Recordings']
+                if not ordered:
+                    args.append('--unordered')
+
+                flattenCli.run(inputPath, outputPath, *args)
+
+                with open(outputPath) as outputFile:
+                    actual = [json.loads(line) for line in outputFile]
+                if ordered:
+                    self.assertEqual([record['ContactId'] for record in actual], [ctr['ContactId'] for ctr in ctrs])
+                self.assertEqual(sorted(actual, key=lambda record: record['ContactId']), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+
+# Tests of flatten, flatten_preserve_lists and unflatten against the implementations of flatten_json 0.1.7 kept by the
+# benchmarks for random objects and mock CTRs, and of flatten from threads sharing its interned keys as the ModifyCtr
+# workers do, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import copy
+import time
+import random
+import threading
+import unittest
+from unittest import mock
+import stubs
+import flatten_json
+import flatten as flattenBenchmark
+import flattenPreserveLists as preserveListsBenchmark
+import unflatten as unflattenBenchmark
+
+def randomFlattenObject(depth=0):
+    # Covers empty containers, falsy values, non string keys and keys that compare equal across types
+    if depth > 4 or random.random() < 0.3:
+        return random.choice([0, 1, 1.5, '', 's', None, False, True, [], {}, ()])
+
+    kind = random.random()
+    if kind < 0.5:
+        return {random.choice(['a', 'b', '', 'x', 0, 1, '1', True]): randomFlattenObject(depth + 1)
+                for x in range(random.randint(0, 4))}
+    elif kind < 0.9:
+        return [randomFlattenObject(depth + 1) for x in range(random.randint(0, 4))]
+    else:
+        return tuple(randomFlattenObject(depth + 1) for x in range(random.randint(0, 3)))
+
+def randomFlattenObjects(count):
+    return [{random.choice(['a', 'b', '', 'x', 'y', 0, 1]): randomFlattenObject() for x in range(random.randint(0, 4))}
+            for y in range(count)]
+
+def randomListsObject(depth=0):
+    # Covers NaN, empty containers, nested lists and keys ending in a digit like the keys of list rows
+    if depth > 4 or random.random() < 0.3:
+        return random.choice([0, 1, 1.5, float('nan'), '', 's', 'a1', None, [], {}])
+
+    kind = random.random()
+    if kind < 0.5:
+        return {random.choice(['a', 'b', 'c2', 'd', 'x']): randomListsObject(depth + 1)
+                for x in range(random.randint(1, 4))}
+    else:
+        return [randomListsObject(depth + 1) for x in range(random.randint(0, 3))]
+
+def randomListsObjects(count):
+    return [{random.choice(['a', 'b', 'c', 'x', 'y']): randomListsObject() for x in range(random.randint(1, 4))}
+            for y in range(count)]
+
+def withoutPrefixKeys(flatCtr):
+    # 0.1.7 drops every key that is the start of another key, such as Agent when AgentConnectionAttempts exists
+    keys = sorted(flatCtr)
+    return {key: flatCtr[key] for i, key in enumerate(keys) if i == len(keys) - 1 or not keys[i + 1].startswith(key)}
+
+class YieldingDict(dict):
+    # Lets the other threads run between reading the interned keys and adding to them
+    def get(self, *args):
+        value = dict.get(self, *args)
+        time.sleep(0)
+        return value
+
+    def __len__(self):
+        length = dict.__len__(self)
+        time.sleep(0)
+        return length
+
+def yieldingChildren(interned):
+    # Stands in for _interned_children, with interned keys in dictionaries that yield on every read
+    def children(separator, key):
+        return interned.setdefault((separator, key), (YieldingDict(), YieldingDict()))
+    return children
+
+class TestFlatten(unittest.TestCase):
+    def test_matches_0_1_7(self):
+        # Mock CTRs and random objects with empty containers, falsy values and keys that compare equal across types
+        random.seed(7)
+        for obj in stubs.mockCtrs(200) + randomFlattenObjects(3000):
+            expected = flattenBenchmark.recursiveFlatten(copy.deepcopy(obj), '_', {'x'})
+            actual = flatten_json.flatten(copy.deepcopy(obj), '_', {'x'})
+            self.assertEqual(list(actual.items()), list(expected.items()), obj)
+
+class TestFlattenPreserveLists(unittest.TestCase):
+    def test_matches_0_1_7(self):
+        random.seed(7)
+        objects = stubs.mockCtrs(50) + randomListsObjects(1000)
+        for kwargs in [{}, {'max_depth': 5}, {'max_list_index': 9, 'max_depth': 2},
+                       {'root_keys_to_ignore': {'x'}, 'separator': '.'}]:
+            for obj in objects:
+                try:
+                    expected = preserveListsBenchmark.legacyFlattenPreserveLists(copy.deepcopy(obj), **kwargs)
+                except (IndexError, KeyError, TypeError, ValueError):
+                    # 0.1.7 fails on empty dictionaries in lists and on a root with a single value
+                    continue
+
+                actual = flatten_json.flatten_preserve_lists(copy.deepcopy(obj), **kwargs)
+                self.assertEqual([list(row.items()) for row in actual], [list(row.items()) for row in expected],
+                                 (obj, kwargs))
+
+class TestUnflatten(unittest.TestCase):
+    def test_matches_0_1_7(self):
+        # The keys of flatten_json 0.1.7 are sorted, the keys are now in the order of the flattened dictionary
+        ctrs = stubs.mockCtrs(50)
+        for numOfAttributes in [0, 100]:
+            for ctr in ctrs:
+                ctr = unflattenBenchmark.wideCtr(ctr, numOfAttributes) if numOfAttributes else ctr
+                flatCtr = withoutPrefixKeys(flatten_json.flatten(ctr, '.'))
+                self.assertEqual(flatten_json.unflatten(flatCtr, '.'), unflattenBenchmark.legacyUnflatten(flatCtr, '.'))
+                self.assertEqual(flatten_json.unflatten_list(flatCtr, '.'),
+                                 unflattenBenchmark.legacyUnflattenList(flatCtr, '.'))
+
+    def test_round_trip(self):
+        # The separator is not part of any CTR key
+        for ctr in stubs.mockCtrs(200):
+            self.assertEqual(flatten_json.unflatten_list(flatten_json.flatten(ctr, '.'), '.'), ctr)
+
+class TestFlattenThreads(unittest.TestCase):
+    def setUp(self):
+        # Switch threads as often as possible so workers intern the same keys at the same time
+        self.switchInterval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switchInterval)
+
+    def flattenTogether(self, record, numOfThreads):
+        barrier = threading.Barrier(numOfThreads)
+        results = [None] * numOfThreads
+
+        def worker(index):
+            barrier.wait()
+            results[index] = flatten_json.flatten(record, '_')
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(numOfThreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_threads_interning_the_same_keys(self):
+        # Every thread interns the keys of the same new list indexes and dictionary keys, each must keep its own key
+        record = {'a': {'c': list(range(20)), 'd': {str(x): x for x in range(20)}}}
+        expected = flatten_json.flatten(record, '_')
+        for trial in range(20):
+            with mock.patch.object(flatten_json, '_interned_children', yieldingChildren({})):
+                for result in self.flattenTogether(record, 8):
+                    self.assertEqual(result, expected)
+                self.assertEqual(flatten_json.flatten(record, '_'), expected)
+
+    def test_ctrs(self):
+        flatten_json._interned_keys.clear()
+        for ctr in stubs.mockCtrs(20):
+            expected = flatten_json.flatten(ctr, '_')
+            for result in self.flattenTogether(ctr, 4):
+                self.assertEqual(result, expected)
@@ -0,0 +1,34 @@
+#!/usr/bin/python
+
+# Tests of the city lookup of the ModifyCtr lambda against the dict of bundled cities, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import unittest
+import stubs
+import ctr_geo
+import lambda_function
+import geo
+
+class TestGeo(unittest.TestCase):
+    def setUp(self):
+        # Spaces, underscores and case are ignored, unknown and empty cities give None
+        ctrs = stubs.mockCtrs(500)
+        cities = ['New York City', 'new_york_city', 'Springfield', '']
+        self.ctrs = ctrs + [{'Attributes': {'udCity': city}} for city in cities]
+        self.cities = [ctr['Attributes']['udCity'] for ctr in self.ctrs if 'udCity' in (ctr.get('Attributes') or {})]
+
+    def test_enricher_matches_bundled_cities(self):
+        enricher = ctr_geo.createEnricher('local')
+        for city in self.cities:
+            self.assertEqual(enricher.get(city), geo.legacyGetGeo(city), repr(city))
+
+    def test_city_enrichment_matches_bundled_cities(self):
+        # The cities are cached once, by the enricher
+        lambda_function.enrichmentStage.prepare(self.ctrs)
+        for city in self.cities:
+            self.assertEqual(lambda_function.cityEnrichment.lookup(city), geo.legacyGetGeo(city), repr(city))
+        self.assertEqual(len(lambda_function.cityEnrichment.cache), 0)
+        self.assertIn(ctr_geo.normalizeCity(self.cities[0]), lambda_function.geoEnricher.geos)
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+
+# Tests of the ModifyCtr lambda handler for Firehose objects in S3 and SQS events against the stub S3 client, run from
+# this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import json
+import datetime
+import unittest
+from unittest import mock
+import stubs
+import ctr_timestamps
+import lambda_function
+
+OBJECT_KEY = 'ctr/year=2021/month=04/day=01/test-1'
+
+class ModifyCtrTestCase(unittest.TestCase):
+    def setUp(self):
+        self.newContainer(stubs.StubS3Client(0))
+
+    def newContainer(self, s3):
+        # Uses s3 with an empty index of the modified objects, as a new container would
+        self.s3 = s3
+        patches = [
+            mock.patch.object(lambda_function, 's3Client', s3),
+            mock.patch.object(lambda_function, 'lastUpdateIndex',
+                              lambda_function.LastUpdateIndex(lambda_function.lastUpdateCacheSize))
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def putObject(self, objectKey, ctrs):
+        body = stubs.mockObject(ctrs)
+        self.putBody(objectKey, body)
+        return body
+
+    def putBody(self, objectKey, body):
+        self.s3.objects[(stubs.BUCKET_NAME, objectKey)] = {'Body': body, 'Metadata': {}}
+
+    def handle(self, ctrs):
+        body = self.putObject(OBJECT_KEY, ctrs)
+        return lambda_function.lambda_handler(stubs.s3Event(stubs.BUCKET_NAME, OBJECT_KEY, len(body)),
+                                              stubs.StubContext())
+
+    def handleQueued(self, bodies):
+        return lambda_function.lambda_handler(stubs.sqsEvent(bodies), stubs.StubContext())
+
+    def modifiedCtrs(self):
+        return {key: json.loads(obj['Body']) for (bucket, key), obj in self.s3.objects.items()
+                if key.startswith('ctrmodified/')}
+
+    def assertNewestVersions(self, versions):
+        newest = {ctr['ContactId']: ctr_timestamps.parseCtrTimestamp(ctr['LastUpdateTimestamp']) for ctr in versions}
+        modified = self.modifiedCtrs()
+        self.assertEqual(len(modified), len(newest))
+        for key, written in modified.items():
+            lastUpdateTimestamp = ctr_timestamps.parseModifiedTimestamp(written['LastUpdateTimestamp'])
+            self.assertEqual(lastUpdateTimestamp, newest[written['ContactId']], key)
+
+def modifiedTimestamp(ctr, minutes):
+    # LastUpdateTimestamp of ctr moved by minutes, as the lambda writes it to the modified object
+    lastUpdateTimestamp = ctr_timestamps.parseCtrTimestamp(ctr['LastUpdateTimestamp'])
+    return (lastUpdateTimestamp + datetime.timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S')
+
+class TestDedupe(ModifyCtrTestCase):
+    def test_newest_version_of_each_contact(self):
+        # The newest version is neither the first nor the last one in the object
+        ctrs = stubs.mockCtrs(20)
+        versions = stubs.mockVersions(ctrs, 3)
+        summary = self.handle(versions[20:40] + versions[40:] + versions[:20])
+        self.assertEqual((summary['Written'], summary['Skipped'], summary['Duplicates']), (20, 0, 40))
+        self.assertNewestVersions(versions)
+
+    def test_order_of_first_appearance(self):
+        ctrs = stubs.mockCtrs(3)
+        versions = stubs.mockVersions(ctrs, 2)
+        records, duplicates = lambda_function.dedupeRecords(versions[::-1], 'ctrmodified', OBJECT_KEY)
+        self.assertEqual(records, versions[5:2:-1])
+        self.assertEqual(duplicates, 3)
+
+    def test_equal_timestamp_keeps_the_first_version(self):
+        ctr = stubs.mockCtrs(1)[0]
+        records, duplicates = lambda_function.dedupeRecords([ctr, dict(ctr, Channel='CHAT')], 'ctrmodified', OBJECT_KEY)
+        self.assertEqual((records, duplicates), ([ctr], 1))
+
+    def test_records_without_a_key_are_kept(self):
+        ctrs = stubs.mockCtrs(2)
+        broken = [{'LastUpdateTimestamp': ctrs[0]['LastUpdateTimestamp']}, dict(ctrs[1], LastUpdateTimestamp=None)]
+        records, duplicates = lambda_function.dedupeRecords(broken + ctrs, 'ctrmodified', OBJECT_KEY)
+        self.assertEqual((records, duplicates), (broken + ctrs, 0))
+
+class TestModifiedLastUpdate(ModifyCtrTestCase):
+    def putModified(self, ctr, body, **metadata):
+        mok = lambda_function.modifiedObjectKey(ctr, 'ctrmodified', OBJECT_KEY)
+        self.s3.objects[(stubs.BUCKET_NAME, mok)] = {'Body': body, 'Metadata': metadata}
+
+    def test_newer_modified_object_is_skipped(self):
+        # The HEAD metadata is enough, the modified object is not read
+        ctr = stubs.mockCtrs(1)[0]
+        self.putModified(ctr, b'', lastupdatetimestamp=modifiedTimestamp(ctr, 1))
+        summary = self.handle([ctr])
+        self.assertEqual((summary['Written'], summary['Skipped']), (0, 1))
+        self.assertEqual(self.s3.requests, {'GetObject': 1, 'HeadObject': 1})
+
+    def test_equal_modified_object_is_skipped(self):
+        ctr = stubs.mockCtrs(1)[0]
+        self.putModified(ctr, b'', lastupdatetimestamp=modifiedTimestamp(ctr, 0))
+        self.assertEqual(self.handle([ctr])['Skipped'], 1)
+
+    def test_older_modified_object_is_replaced(self):
+        ctr = stubs.mockCtrs(1)[0]
+        self.putModified(ctr, b'', lastupdatetimestamp=modifiedTimestamp(ctr, -1))
+        self.assertEqual(self.handle([ctr])['Written'], 1)
+        self.assertNewestVersions([ctr])
+
+    def test_modified_object_without_metadata_is_read(self):
+        # Objects written before the metadata was added
+        ctr = stubs.mockCtrs(1)[0]
+        self.putModified(ctr, json.dumps({'LastUpdateTimestamp': modifiedTimestamp(ctr, 1)}).encode('utf-8'))
+        summary = self.handle([ctr])
+        self.assertEqual((summary['Written'], summary['Skipped']), (0, 1))
+        self.assertEqual(self.s3.requests, {'GetObject': 2, 'HeadObject': 1})
+
+class TestVersions(ModifyCtrTestCase):
+    def test_concurrent_versions_without_dedupe(self):
+        # Without dedupe every version is processed by the workers at the same time, newest first so the older versions
+        # race the writes
+        versions = stubs.mockVersions(stubs.mockCtrs(50), 3)
+        with mock.patch.object(lambda_function, 'dedupe', False), \
+                mock.patch.object(lambda_function, 'processingMode', 'batch'):
+            for trial in range(5):
+                self.newContainer(stubs.StubS3Client(1, jitterMs=1))
+                summary = self.handle(versions[::-1])
+                self.assertEqual((summary['Written'] + summary['Skipped'], summary['Failed']), (150, 0))
+                self.assertNewestVersions(versions)
+
+class TestObjects(ModifyCtrTestCase):
+    def putObjects(self, numOfObjects, numOfCtrs):
+        objectKeys = ['ctr/year=2021/month=04/day=01/test-{}'.format(index) for index in range(numOfObjects)]
+        return [(objectKey, self.putObject(objectKey, stubs.mockCtrs(numOfCtrs))) for objectKey in objectKeys]
+
+    def test_invocations_write_the_same_objects(self):
+        # One invocation per object, one S3 event of all objects and one SQS message per object
+        objects = self.putObjects(5, 20)
+        for objectKey, body in objects:
+            lambda_function.lambda_handler(stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)), stubs.StubContext())
+        expected = self.modifiedCtrs()
+        self.assertEqual(len(expected), 100)
+
+        for event in [stubs.s3ObjectsEvent([(stubs.BUCKET_NAME, objectKey, len(body)) for objectKey, body in objects]),
+                      stubs.sqsEvent([stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body))
+                                      for objectKey, body in objects])]:
+            self.newContainer(stubs.StubS3Client(0))
+            for objectKey, body in objects:
+                self.putBody(objectKey, body)
+            summary = lambda_function.lambda_handler(event, stubs.StubContext())
+            self.assertEqual(summary.get('batchItemFailures', []), [])
+            self.assertEqual(self.modifiedCtrs(), expected)
+
+    def test_failed_messages(self):
+        # A missing object, an empty object and a message that is not an S3 event fail their message only, the test
+        # event S3 sends when the notification is created is ignored
+        [(objectKey, body)] = self.putObjects(1, 20)
+        with self.assertLogs(lambda_function.logger, 'ERROR'):
+            summary = self.handleQueued([
+                stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)),
+                stubs.s3Event(stubs.BUCKET_NAME, 'ctr/year=2021/month=04/day=01/missing', 10),
+                stubs.s3Event(stubs.BUCKET_NAME, objectKey, 0),
+                '{"Records": ',
+                {'Service': 'Amazon S3', 'Event': 's3:TestEvent'}
+            ])
+        self.assertEqual([failure['itemIdentifier'] for failure in summary['batchItemFailures']],
+                         ['message-3', 'message-1', 'message-2'])
+        self.assertEqual(summary['Written'], 20)
+
+    def test_failed_object_without_queue(self):
+        # Without SQS a failed object fails the invocation, the other objects are still processed
+        [(objectKey, body)] = self.putObjects(1, 20)
+        event = stubs.s3ObjectsEvent([(stubs.BUCKET_NAME, objectKey, len(body)),
+                                      (stubs.BUCKET_NAME, 'ctr/year=2021/month=04/day=01/missing', 10)])
+        with self.assertLogs(lambda_function.logger, 'ERROR'), self.assertRaisesRegex(Exception, 'NoSuchKey'):
+            lambda_function.lambda_handler(event, stubs.StubContext())
+        self.assertEqual(len(self.modifiedCtrs()), 20)
+
+    def test_newest_version_across_objects(self):
+        # Each object holds one version of the same contacts, newest first, so the objects processed at the same time
+        # race their writes. The response only counts the records
+        versions = stubs.mockVersions(stubs.mockCtrs(30), 3)
+        for trial in range(5):
+            self.newContainer(stubs.StubS3Client(1, jitterMs=1))
+            bodies = []
+            for index, start in enumerate(range(60, -1, -30)):
+                objectKey = 'ctr/year=2021/month=04/day=01/versions-{}'.format(index)
+                body = self.putObject(objectKey, versions[start:start + 30])
+                bodies.append(stubs.s3Event(stubs.BUCKET_NAME, objectKey, len(body)))
+            summary = self.handleQueued(bodies)
+            self.assertEqual(summary['batchItemFailures'], [])
+            self.assertNotIn('Records', summary)
+            for objectSummary in summary['Objects']:
+                self.assertNotIn('Records', objectSummary)
+            self.assertNewestVersions(versions)
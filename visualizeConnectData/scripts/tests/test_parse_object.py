@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+# Tests of reading plain and GZIP compressed Firehose objects with parseObject and of the key of their parquet
+# objects, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import io
+import gzip
+import unittest
+from unittest import mock
+import stubs
+import lambda_function
+
+FOLDER = 'ctr/year=2021/month=04/day=01/'
+
+class TestParseObject(unittest.TestCase):
+    def setUp(self):
+        self.ctrs = stubs.mockCtrs(50)
+        self.body = stubs.mockObject(self.ctrs)
+        self.s3 = stubs.StubS3Client(0)
+        self.s3Patch = mock.patch.object(lambda_function, 's3Client', self.s3)
+        self.s3Patch.start()
+
+    def tearDown(self):
+        self.s3Patch.stop()
+
+    def parse(self, objectKey, body, **stored):
+        self.s3.objects[(stubs.BUCKET_NAME, objectKey)] = dict({'Body': body, 'Metadata': {}}, **stored)
+        return list(lambda_function.parseObject(stubs.BUCKET_NAME, objectKey))
+
+    def test_plain_object(self):
+        self.assertEqual(self.parse(FOLDER + 'plain-1', self.body), self.ctrs)
+
+    def test_gzip_extension(self):
+        self.assertEqual(self.parse(FOLDER + 'firehose-1.gz', gzip.compress(self.body)), self.ctrs)
+
+    def test_gzip_content_encoding(self):
+        self.assertEqual(self.parse(FOLDER + 'encoded-1', gzip.compress(self.body), ContentEncoding='gzip'), self.ctrs)
+
+    def test_gzip_magic_number(self):
+        self.assertEqual(self.parse(FOLDER + 'content-1', gzip.compress(self.body)), self.ctrs)
+
+    def test_gzip_members(self):
+        # Objects concatenated by other tools hold one gzip member per part
+        half = self.body.index(b'\n', len(self.body) // 2) + 1
+        body = gzip.compress(self.body[:half]) + gzip.compress(self.body[half:])
+        self.assertEqual(self.parse(FOLDER + 'members-1', body), self.ctrs)
+
+    def test_chunks_smaller_than_a_line(self):
+        with mock.patch.object(lambda_function, 'STREAM_CHUNK_SIZE', 7):
+            self.assertEqual(self.parse(FOLDER + 'plain-1', self.body), self.ctrs)
+            self.assertEqual(self.parse(FOLDER + 'content-1', gzip.compress(self.body)), self.ctrs)
+
+    def test_objects_shorter_than_the_magic_number(self):
+        self.assertEqual(self.parse(FOLDER + 'empty-1', b''), [])
+        self.assertEqual(self.parse(FOLDER + 'short-1', b'1'), [1])
+
+class TestParquetObjectKey(unittest.TestCase):
+    def test_gzip_extension_is_not_kept(self):
+        self.assertEqual(lambda_function.parquetObjectKey('ctrmodified', FOLDER + 'benchmark-1.gz'),
+                         'ctrmodified/year=2021/month=04/day=01/benchmark-1.parquet')
+        self.assertEqual(lambda_function.parquetObjectKey('ctrmodified', FOLDER + 'benchmark-1'),
+                         'ctrmodified/year=2021/month=04/day=01/benchmark-1.parquet')
+
+class TestPeekedStream(unittest.TestCase):
+    def test_reads_return_the_head_first(self):
+        for sizes in [[1, 1, 1, -1], [3, 100], [2, 5, 1], [None]]:
+            stream = lambda_function.PeekedStream(io.BytesIO(b'abcdefgh'), 2)
+            self.assertEqual(stream.head, b'ab')
+            self.assertEqual(b''.join(stream.read(size) for size in sizes), b'abcdefgh')
+            self.assertEqual(stream.read(10), b'')
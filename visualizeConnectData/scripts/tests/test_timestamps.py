@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+# Tests of the ctr_timestamps parsers against strptime for random and malformed timestamps, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import random
+import datetime
+import unittest
+import stubs
+import ctr_timestamps
+
+CTR_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MODIFIED_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_FORMAT = '%Y-%m-%d'
+
+def strptimeDate(value):
+    return datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+PARSERS = [
+    ('ctr', ctr_timestamps.parseCtrTimestamp, lambda value: datetime.datetime.strptime(value, CTR_TIMESTAMP_FORMAT)),
+    ('modified', ctr_timestamps.parseModifiedTimestamp,
+     lambda value: datetime.datetime.strptime(value, MODIFIED_TIMESTAMP_FORMAT)),
+    ('date', ctr_timestamps.parseDate, strptimeDate)
+]
+
+def randomTimestamp(fmt):
+    # Mostly valid values, with some fields out of range or replaced by characters strptime or int treat specially
+    fields = [
+        '{:04d}'.format(random.randint(1, 9999)),
+        '{:02d}'.format(random.randint(0, 13)),
+        '{:02d}'.format(random.randint(0, 32)),
+        '{:02d}'.format(random.randint(0, 24)),
+        '{:02d}'.format(random.randint(0, 60)),
+        '{:02d}'.format(random.randint(0, 61))
+    ]
+    if random.random() < 0.3:
+        index = random.randrange(len(fields))
+        fields[index] = random.choice(['', '1', '+1', '-1', ' 1', '1_', '١٢', '²', '123', 'ab'])
+
+    value = fmt.replace('%Y', fields[0]).replace('%m', fields[1]).replace('%d', fields[2])
+    value = value.replace('%H', fields[3]).replace('%M', fields[4]).replace('%S', fields[5])
+    if random.random() < 0.05:
+        value = value[:-1]
+    return value
+
+def outcome(function, value):
+    try:
+        return function(value)
+    except (TypeError, ValueError) as e:
+        return type(e)
+
+class TestTimestamps(unittest.TestCase):
+    def test_parsers_match_strptime(self):
+        random.seed(7)
+        for name, parser, reference in PARSERS:
+            for fmt in [CTR_TIMESTAMP_FORMAT, MODIFIED_TIMESTAMP_FORMAT, DATE_FORMAT]:
+                for x in range(5000):
+                    value = randomTimestamp(fmt)
+                    self.assertEqual(outcome(parser, value), outcome(reference, value),
+                                     '{} parser for {!r}'.format(name, value))
+
+            for value in [None, 0, '']:
+                self.assertEqual(outcome(parser, value), outcome(reference, value),
+                                 '{} parser for {!r}'.format(name, value))
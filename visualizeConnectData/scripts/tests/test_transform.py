@@ -0,0 +1,20 @@
+#!/usr/bin/python
+
+# Tests of modifyFlattenData against the version that scanned the record for every step, run from this folder
+# python3 -m unittest
+
+import sys
+sys.path.insert(1, '../benchmark')
+
+import copy
+import unittest
+import stubs
+import lambda_function
+import transform
+
+class TestModifyFlattenData(unittest.TestCase):
+    def test_matches_previous_version(self):
+        for ctr in stubs.mockCtrs(500):
+            record = lambda_function.flatten(ctr, '_')
+            expected = transform.legacyModifyFlattenData(copy.deepcopy(record))
+            self.assertEqual(lambda_function.modifyFlattenData(copy.deepcopy(record)), expected, record['ContactId'])